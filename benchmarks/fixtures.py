@@ -0,0 +1,108 @@
+import random
+import zipfile
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+WORDS = (
+    "the reader opens pages quickly while documents of every size stay light on "
+    "memory and startup so that turning through a long book never waits on the "
+    "renderer cache index layout chapter figure table section paragraph"
+).split()
+
+def paragraphs(rng: random.Random, count: int, words: int = 80):
+    """Deterministic filler text."""
+    return [' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.' for _ in range(count)]
+
+def noise_png(rng: random.Random, width: int, height: int) -> bytes:
+    """A PNG that does not compress well, so decoding it costs something."""
+    samples = bytes(rng.getrandbits(8) for _ in range(width * height * 3))
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, samples, False)
+    return pixmap.tobytes('png')
+
+def make_pdf(path: Path, pages: int, images_per_page: int = 0, paras_per_page: int = 6):
+    """A PDF of A4 text pages, optionally with images drawn from a small pool."""
+    rng = random.Random(pages * 31 + images_per_page)
+    images = [noise_png(rng, 480, 360) for _ in range(8)] if images_per_page else []
+    document = fitz.open()
+    for number in range(pages):
+        page = document.new_page(width=595, height=842)
+        page.insert_text((56, 60), f"Page {number + 1}", fontsize=18)
+        text = '\n\n'.join(paragraphs(rng, paras_per_page, 60))
+        top = 80
+        for i in range(images_per_page):
+            height = 640 / images_per_page
+            page.insert_image(fitz.Rect(56, top, 539, top + height - 10), stream=images[(number + i) % len(images)])
+            top += height
+        page.insert_textbox(fitz.Rect(56, top, 539, 800), text, fontsize=9)
+    document.save(path, garbage=3, deflate=True)
+    document.close()
+
+CONTAINER = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>
+"""
+
+def make_epub(path: Path, chapters: int, images_per_chapter: int = 0, paras_per_chapter: int = 40):
+    """An EPUB with one XHTML file per chapter, optionally with images."""
+    rng = random.Random(chapters * 17 + images_per_chapter)
+    images = [noise_png(rng, 480, 360) for _ in range(8)] if images_per_chapter else []
+    manifest = []
+    spine = []
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        archive.writestr('META-INF/container.xml', CONTAINER, compress_type=zipfile.ZIP_DEFLATED)
+        for i, data in enumerate(images):
+            archive.writestr(f'OEBPS/Images/img{i}.png', data, compress_type=zipfile.ZIP_STORED)
+            manifest.append(f'<item id="img{i}" href="Images/img{i}.png" media-type="image/png"/>')
+        for number in range(chapters):
+            body = [f'<h1>Chapter {number + 1}</h1>']
+            texts = paragraphs(rng, paras_per_chapter)
+            step = max(1, len(texts) // (images_per_chapter + 1))
+            for i, text in enumerate(texts):
+                body.append(f'<p>{text}</p>')
+                if images_per_chapter and i % step == step - 1 and i // step < images_per_chapter:
+                    body.append(f'<img src="../Images/img{(number + i) % len(images)}.png" alt=""/>')
+            xhtml = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<html xmlns="http://www.w3.org/1999/xhtml"><head>'
+                f'<title>Chapter {number + 1}</title></head><body>{"".join(body)}</body></html>'
+            )
+            archive.writestr(f'OEBPS/Text/ch{number}.xhtml', xhtml, compress_type=zipfile.ZIP_DEFLATED)
+            manifest.append(f'<item id="ch{number}" href="Text/ch{number}.xhtml" media-type="application/xhtml+xml"/>')
+            spine.append(f'<itemref idref="ch{number}"/>')
+        opf = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="id">bench-{chapters}-{images_per_chapter}</dc:identifier>'
+            f'<dc:title>Benchmark {chapters} chapters</dc:title><dc:creator>Benchmark</dc:creator>'
+            '<dc:language>en</dc:language></metadata>'
+            f'<manifest>{"".join(manifest)}</manifest><spine>{"".join(spine)}</spine></package>'
+        )
+        archive.writestr('OEBPS/content.opf', opf, compress_type=zipfile.ZIP_DEFLATED)
+
+# name -> (maker, arguments); the name is also the fixture's file stem
+FIXTURES = {
+    'pdf-text-200': (make_pdf, {'pages': 200}),
+    'pdf-images-60': (make_pdf, {'pages': 60, 'images_per_page': 2}),
+    'pdf-text-10k': (make_pdf, {'pages': 10000, 'paras_per_page': 2}),
+    'epub-text-40': (make_epub, {'chapters': 40}),
+    'epub-images-40': (make_epub, {'chapters': 40, 'images_per_chapter': 4}),
+    'epub-text-2k': (make_epub, {'chapters': 2000, 'paras_per_chapter': 10}),
+}
+
+def fixture_path(directory: Path, name: str) -> Path:
+    return Path(directory) / f"{name}.{name.split('-')[0]}"
+
+def ensure_fixture(directory: Path, name: str) -> Path:
+    """Path of a fixture, generating it the first time it is needed."""
+    path = fixture_path(directory, name)
+    if not path.exists():
+        maker, arguments = FIXTURES[name]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"tmp-{path.name}")
+        maker(tmp, **arguments)
+        tmp.replace(path)
+    return path
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Headless benchmarks for opening documents, turning pages and zooming.
+
+Every case runs in a fresh process under the offscreen Qt platform with an
+empty page cache, against synthetic documents generated on first use:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json   # exits 1 on a regression
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+# Differences smaller than this are noise whatever the relative change
+NOISE_FLOOR = {'ms': 5.0, 'mb': 10.0}
+
+def peak_rss_mb(who: str):
+    """Peak resident set size in MiB, or None where it cannot be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+def percentile(samples, fraction: float) -> float:
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    # Rounded first, so that e.g. 0.07 * 100 = 7.000000000000001 is rank 7
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[min(len(ordered) - 1, max(0, rank - 1))]
+
+def wait_for(signal, timeout: float, done=None):
+    """Run the event loop until signal fires (and done() holds, if given)."""
+    from PySide6.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    timed_out = []
+
+    def check(*args):
+        if done is None or done():
+            loop.quit()
+
+    def expire():
+        timed_out.append(True)
+        loop.quit()
+
+    signal.connect(check)
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(expire)
+    timer.start(round(timeout * 1000))
+    loop.exec()
+    timer.stop()
+    signal.disconnect(check)
+    if timed_out:
+        raise TimeoutError(f"no {signal} within {timeout}s")
+
+def idle(seconds: float):
+    """Let the event loop and background work run for a while."""
+    from PySide6.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(round(seconds * 1000), loop.quit)
+    loop.exec()
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def at_end(kind: str, viewer) -> bool:
+    """Whether next_page() has nowhere left to go."""
+    if kind == 'pdf':
+        return viewer.current_page >= len(viewer.document) - 1
+    return (viewer.current_page >= len(viewer.spine_items) - 1
+            and viewer.screens is not None and viewer.screen >= viewer.screens - 1)
+
+def measure_case(kind: str, path: str, turns: int, pause: float, timeout: float):
+    """Open one document and time it; returns a dict of metrics."""
+    start = time.perf_counter()
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import Qt
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication([sys.argv[0]])
+    if kind == 'pdf':
+        from viewer.pdf_viewer import PDFViewer as Viewer
+    else:
+        from viewer.epub_viewer import EpubViewer as Viewer
+    metrics = {'startup_ms': elapsed_ms(start)}
+
+    # Time to first page: construction until the first page is on screen
+    start = time.perf_counter()
+    viewer = Viewer(path)
+    viewer.show()
+    wait_for(viewer.first_frame, timeout)
+    metrics['first_page_ms'] = elapsed_ms(start)
+
+    # Page turns at reading pace, so prefetching gets its chance like it would
+    if kind == 'pdf':
+        turned = viewer.canvas.painted
+    else:
+        # Turning moves between screens of a chapter, which takes the chapter laid out
+        turned = viewer.screen_shown
+        if viewer.screens is None:
+            wait_for(turned, timeout, lambda: viewer.screens is not None)
+    latencies = []
+    for _ in range(turns):
+        if at_end(kind, viewer):
+            break  # Short documents get fewer turns rather than a timeout
+        idle(pause)
+        start = time.perf_counter()
+        viewer.next_page()
+        wait_for(turned, timeout)
+        latencies.append(elapsed_ms(start))
+    if latencies:
+        metrics['next_page_p50_ms'] = percentile(latencies, 0.50)
+        metrics['next_page_p99_ms'] = percentile(latencies, 0.99)
+
+    # Zoom: until every tile covering the viewport is rendered and painted
+    if kind == 'pdf':
+        idle(pause)
+        start = time.perf_counter()
+        viewer.set_zoom(2.0)
+
+        def sharp():
+            return all(key in viewer.cache for key in viewer._tile_keys(viewer.visible_rect()))
+
+        if not sharp():
+            wait_for(viewer.canvas.painted, timeout, sharp)
+        metrics['zoom_ms'] = elapsed_ms(start)
+
+    metrics['peak_rss_mb'] = peak_rss_mb('self')
+    viewer.cleanup()
+    viewer.close()
+    app.processEvents()
+    if kind == 'pdf':
+        from viewer.process_renderer import shutdown_shared_pool
+        shutdown_shared_pool()
+    # Once the render workers have exited their peak is known too
+    for process in multiprocessing.active_children():
+        process.join(timeout)
+    children = peak_rss_mb('children')
+    if children:
+        metrics['child_peak_rss_mb'] = children
+    return metrics
+
+def run_case(name: str, path: Path, args) -> dict:
+    """Run one case in a fresh process with its own empty cache directory."""
+    with tempfile.TemporaryDirectory(prefix='reader-bench-') as cache_dir:
+        env = dict(os.environ, READER_CACHE_DIR=cache_dir)
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        command = [
+            sys.executable, __file__, '--measure', name.split('-')[0], str(path),
+            '--turns', str(args.turns), '--pause', str(args.pause), '--timeout', str(args.timeout),
+        ]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def median_metrics(runs):
+    """Median of every metric over repeated runs of a case."""
+    return {metric: round(statistics.median(run[metric] for run in runs), 2)
+            for metric in runs[0] if all(run.get(metric) is not None for run in runs)}
+
+def regressions(results: dict, baseline: dict, threshold: float):
+    """(case, metric, baseline, current) for every metric that got worse by more than threshold."""
+    found = []
+    for case, metrics in results['cases'].items():
+        previous = baseline.get('cases', {}).get(case, {})
+        for metric, value in metrics.items():
+            before = previous.get(metric)
+            if not isinstance(before, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            floor = NOISE_FLOOR.get(metric.rsplit('_', 1)[-1], 0.0)
+            if value > before * (1 + threshold) and value - before > floor:
+                found.append((case, metric, before, value))
+    return found
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv):
+    from fixtures import FIXTURES
+    parser = argparse.ArgumentParser(description="Benchmark opening, page turns and zoom headlessly")
+    parser.add_argument('cases', nargs='*', metavar='CASE',
+                        help=f"cases to run (default: all of {', '.join(FIXTURES)})")
+    parser.add_argument('--fixtures', default=str(ROOT / 'benchmarks' / 'fixtures'), metavar='DIR',
+                        help="where generated documents are kept between runs")
+    parser.add_argument('--output', metavar='FILE', help="write results as JSON to FILE")
+    parser.add_argument('--baseline', metavar='FILE', help="compare with earlier results and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed relative slowdown against the baseline (default: 0.25)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case; the median is reported")
+    parser.add_argument('--turns', type=int, default=100, help="page turns per case (default: 100)")
+    parser.add_argument('--pause', type=float, default=0.05, help="seconds between page turns (default: 0.05)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds to wait for any one step")
+    parser.add_argument('--measure', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    unknown = [case for case in args.cases if case not in FIXTURES]
+    if unknown:
+        parser.error(f"unknown case: {', '.join(unknown)}")
+    return args
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.measure:
+        kind, path = args.measure
+        print(json.dumps(measure_case(kind, path, args.turns, args.pause, args.timeout)))
+        return 0
+
+    from fixtures import FIXTURES, ensure_fixture
+    results = {
+        'commit': git_commit(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cases': {},
+        'errors': {},
+    }
+    for name in args.cases or FIXTURES:
+        path = ensure_fixture(args.fixtures, name)
+        try:
+            metrics = median_metrics([run_case(name, path, args) for _ in range(args.repeat)])
+        except (RuntimeError, ValueError) as e:
+            results['errors'][name] = str(e)
+            print(f"{name:<16} failed: {e}", file=sys.stderr)
+            continue
+        results['cases'][name] = metrics
+        print(f"{name:<16} " + '  '.join(f"{metric}={value}" for metric, value in metrics.items()))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+    status = 1 if results['errors'] else 0
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for case, metric, before, value in found:
+            print(f"REGRESSION {case} {metric}: {before} -> {value}", file=sys.stderr)
+        if found:
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,7 +7,6 @@ setup(
     install_requires=[
         "PySide6>=6.5.0",
         "python-poppler-qt>=0.24.0",
-        "ebooklib>=0.17.1",
         "beautifulsoup4>=4.12.0",
     ],
     entry_points={
@@ -1,67 +1,81 @@
 #!/usr/bin/env python3
+import time
+_START = time.perf_counter()  # Taken before any heavy import for --profile-startup
+
 import sys
 import os
+import argparse
 from pathlib import Path
-from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QFileDialog, QMessageBox
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QKeyEvent
 
-from viewer.pdf_viewer import PDFViewer
-from viewer.epub_viewer import EpubViewer
+from utils.profiling import StartupProfiler
+
+# Qt is imported in main(): worker processes are spawned, which runs this
+# script again in each of them, and they have no use for Qt. Viewer backends
+# are imported in ReaderWindow._create_viewer, so opening a PDF never loads
+# QtWebEngine and opening an ePub never loads PyMuPDF.
+
+def parse_args(argv):
+    """Split our own options from the ones meant for Qt."""
+    parser = argparse.ArgumentParser(description="Minimalist PDF and ePub reader")
+    parser.add_argument('file', nargs='?', help="PDF or ePub file to open")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each startup phase takes, then exit")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete the on-disk page cache and exit")
+    parser.add_argument('--prewarm', metavar='DIR',
+                        help="render the first pages of every PDF under DIR into the page cache and exit")
+    parser.add_argument('--prewarm-pages', type=int, default=20, metavar='N',
+                        help="pages per document for --prewarm (default: 20)")
+    parser.add_argument('--library', action='append', metavar='DIR',
+                        help="browse the PDFs and ePubs under DIR (may be given more than once)")
+    return parser.parse_known_args(argv)
 
-class ReaderWindow(QMainWindow):
-    def __init__(self, file_path: str):
-        super().__init__()
-        # Remove forced full-screen and frameless window
-        self.setWindowTitle("Reader")
-        
-        # Create central widget
-        self.central_widget = QWidget()
-        self.setCentralWidget(self.central_widget)
-        
-        # Initialize viewer based on file type
-        self.viewer = self._create_viewer(file_path)
-        if self.viewer:
-            self.setCentralWidget(self.viewer)
-        else:
-            QMessageBox.critical(self, "Unsupported File", f"Cannot open file: {file_path}")
-            self.close()
-    
-    def _create_viewer(self, file_path: str):
-        ext = Path(file_path).suffix.lower()
-        if ext == '.pdf':
-            return PDFViewer(file_path)
-        elif ext == '.epub':
-            return EpubViewer(file_path)
-        return None
-    
-    def keyPressEvent(self, event: QKeyEvent):
-        if event.key() == Qt.Key_Escape:
-            self.close()
-        elif event.key() == Qt.Key_Space or event.key() == Qt.Key_Right:
-            if self.viewer:
-                self.viewer.next_page()
-        elif event.key() == Qt.Key_Backspace or event.key() == Qt.Key_Left:
-            if self.viewer:
-                self.viewer.previous_page()
-        elif event.key() == Qt.Key_Plus or event.key() == Qt.Key_Equal:
-            if isinstance(self.viewer, PDFViewer):
-                self.viewer.zoom_in()
-        elif event.key() == Qt.Key_Minus:
-            if isinstance(self.viewer, PDFViewer):
-                self.viewer.zoom_out()
-        elif event.key() == Qt.Key_0:
-            if isinstance(self.viewer, PDFViewer):
-                self.viewer.reset_zoom()
-        super().keyPressEvent(event)
+def run_cache_command(args):
+    """Handle --clear-cache and --prewarm without opening a window."""
+    from utils.disk_cache import RasterCache
+    cache = RasterCache()
+    if args.clear_cache:
+        cache.clear()
+        print(f"Cleared {cache.root}")
+    if args.prewarm:
+        from viewer.pdf_viewer import prewarm
+        paths = [str(p) for p in sorted(Path(args.prewarm).rglob('*')) if p.suffix.lower() == '.pdf']
+        for path, error in prewarm(paths, args.prewarm_pages, cache):
+            if error is None:
+                print(f"Prewarmed {path}")
+            else:
+                print(f"Skipped {path}: {error}", file=sys.stderr)
+        if cache.evicted:
+            print(f"Warning: the page cache is capped at {cache.max_bytes // (1024 * 1024)} MB, so "
+                  f"{cache.evicted} pages were evicted to make room; set READER_CACHE_MAX_MB "
+                  f"to keep more", file=sys.stderr)
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.clear_cache or args.prewarm:
+        run_cache_command(args)
+        sys.exit(0)
+    profiler = StartupProfiler(start=_START, enabled=args.profile_startup)
+    from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox
+    from PySide6.QtCore import Qt, QTimer
+    from viewer.reader_window import LibraryWindow, ReaderWindow
+    profiler.mark('imports')
+
+    # QtWebEngine is imported after the application exists, which it only
+    # supports when contexts are shared
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1] + qt_args)
+    profiler.mark('QApplication')
     file_path = None
 
+    if args.library and not args.file:
+        library = LibraryWindow(args.library)
+        library.show()
+        sys.exit(app.exec())
+
     # If a file is provided as an argument, use it
-    if len(sys.argv) == 2:
-        file_path = sys.argv[1]
+    if args.file:
+        file_path = args.file
         if not os.path.exists(file_path):
             QMessageBox.critical(None, "File Not Found", f"File not found: {file_path}")
             sys.exit(1)
@@ -79,9 +93,12 @@ def main():
             # User cancelled
             sys.exit(0)
 
-    window = ReaderWindow(file_path)
+    window = ReaderWindow(file_path, profiler)
     window.show()
+    profiler.mark('window shown')
+    # Open the document once the event loop is running and the window is up
+    QTimer.singleShot(0, window.load_document)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main() 
@@ -0,0 +1,10 @@
+def cancel_pending(futures):
+    """Cancel every future in futures that has not started yet.
+
+    Executor.shutdown(cancel_futures=True) does this but needs Python 3.9,
+    so executors are shut down only after their futures are cancelled here.
+    The futures are copied first, as done callbacks may remove them from
+    the collection while we iterate.
+    """
+    for future in list(futures):
+        future.cancel()
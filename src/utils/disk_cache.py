@@ -0,0 +1,199 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+import zlib
+from pathlib import Path
+
+from PySide6.QtGui import QImage
+
+# Raster files start with this header: magic, width, height, bytes per line.
+# The pixel rows follow, either as they are or zlib compressed.
+HEADER = struct.Struct('<4sIII')
+MAGIC_RAW = b'RDR1'
+MAGIC_ZLIB = b'RDR2'
+
+# Level 1 already shrinks a text page about twenty times, and speed matters
+# more than ratio. Inflating takes a few milliseconds for a text page but
+# several times that for a photo, which barely compresses, so pages are only
+# stored compressed when that makes them at least this many times smaller.
+COMPRESS_LEVEL = 1
+MIN_COMPRESSION = 4
+
+# Colorspaces we store, mapped to the QImage format of their samples
+FORMATS = {'rgb': QImage.Format_RGB888}
+
+def cache_root() -> Path:
+    """Directory holding everything the reader caches between sessions."""
+    override = os.environ.get('READER_CACHE_DIR')
+    if override:
+        return Path(override)
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'reader'
+
+def cache_max_bytes() -> int:
+    """Size cap of the page cache, READER_CACHE_MAX_MB or 1 GB."""
+    try:
+        return int(os.environ['READER_CACHE_MAX_MB']) * 1024 * 1024
+    except (KeyError, ValueError):
+        return 1024 * 1024 * 1024
+
+_hash_lock = threading.Lock()
+
+def document_hash(file_path: str, compute: bool = True) -> str:
+    """Content hash of a document.
+
+    Hashing a large file takes a while, so results are remembered in the
+    cache directory keyed by path, size and modification time. With compute
+    set to False only remembered hashes are returned, and None otherwise.
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    memo_key = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+    memo_path = cache_root() / 'hashes.json'
+    with _hash_lock:
+        try:
+            memo = json.loads(memo_path.read_text())
+        except (OSError, ValueError):
+            memo = {}
+        digest = memo.get(memo_key)
+        if digest or not compute:
+            return digest
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _hash_lock:
+        memo[memo_key] = digest
+        try:
+            memo_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = memo_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(memo))
+            os.replace(tmp, memo_path)
+        except OSError:
+            pass  # A read-only cache only costs us the memo
+    return digest
+
+class RasterCache:
+    """Rendered pages kept on disk across sessions.
+
+    Each page is one file under pages/<document hash>/: a small header
+    followed by the pixel rows, zlib compressed when that pays off, so
+    reading it back is one mmap and at most one inflate. The total size is
+    capped; reads refresh a file's mtime and the least recently used files
+    are evicted first.
+    """
+
+    def __init__(self, root: Path = None, max_bytes: int = None):
+        self.root = Path(root) if root is not None else cache_root() / 'pages'
+        self.max_bytes = max_bytes or cache_max_bytes()
+        self.evicted = 0  # Pages evicted to stay under the cap
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Measured on the first write
+
+    def _path(self, doc_hash: str, key, colorspace: str) -> Path:
+        return self.root / doc_hash / f"{key.page}-{key.scale * key.zoom:.6f}-{colorspace}.raw"
+
+    def has(self, doc_hash: str, key, colorspace: str = 'rgb') -> bool:
+        """Whether key is on disk, without reading it."""
+        return self._path(doc_hash, key, colorspace).exists()
+
+    def get(self, doc_hash: str, key, colorspace: str = 'rgb'):
+        """Cached image for key, or None if it is not on disk."""
+        path = self._path(doc_hash, key, colorspace)
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, width, height, stride = HEADER.unpack_from(mapped)
+                view = memoryview(mapped)[HEADER.size:]
+                try:
+                    if magic == MAGIC_ZLIB:
+                        pixels = zlib.decompress(view)
+                    elif magic == MAGIC_RAW:
+                        pixels = view
+                    else:
+                        return None
+                    if len(pixels) < stride * height:
+                        return None
+                    # Copy out of the mapping before it is closed
+                    image = QImage(pixels, width, height, stride, FORMATS[colorspace]).copy()
+                finally:
+                    view.release()
+            os.utime(path)
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+        return image
+
+    def put(self, doc_hash: str, key, image: QImage, colorspace: str = 'rgb'):
+        """Write an image to disk, evicting old pages if over the size cap."""
+        path = self._path(doc_hash, key, colorspace)
+        pixels = zlib.compress(image.constBits(), COMPRESS_LEVEL)
+        if len(pixels) * MIN_COMPRESSION <= image.sizeInBytes():
+            magic = MAGIC_ZLIB
+        else:
+            magic = MAGIC_RAW
+            pixels = image.constBits()
+        header = HEADER.pack(magic, image.width(), image.height(), image.bytesPerLine())
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(header)
+                f.write(pixels)
+            try:
+                # Rewriting a page must not count its old file twice
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._entries())
+            else:
+                self._total_bytes += HEADER.size + len(pixels) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(mtime, path, size) for every cached page."""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.glob('*/*.raw'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """Remove least recently used pages until well under the cap."""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                self.evicted += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self):
+        """Delete every cached page."""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._total_bytes = 0
@@ -0,0 +1,116 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Elsewhere only the peak is available; it is the closest we get
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Recorder:
+    """Timings, hit counts and gauges from the render paths.
+
+    Timings go into a fixed-size ring buffer, so recording is an append and
+    memory stays bounded however long the reader runs. With a trace file
+    every timing and gauge is also written to it as one JSON object per line.
+    """
+
+    def __init__(self, size: int = 4096, trace: str = None):
+        self.timings = deque(maxlen=size)  # (name, end time, seconds)
+        self.counters = {}  # name -> [hits, misses]
+        self.gauges = {}  # name -> latest value
+        self._trace = None
+        self._trace_lock = threading.Lock()
+        if trace:
+            self._open_trace(trace)
+
+    def _open_trace(self, trace: str):
+        if trace == '-':
+            self._trace = sys.stderr
+            return
+        try:
+            self._trace = open(trace, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"Cannot write trace to {trace}: {e}", file=sys.stderr)
+            return
+        atexit.register(self._trace.close)
+
+    def _write(self, entry: dict):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._trace_lock:
+            if not self._trace.closed:
+                self._trace.write(line)
+
+    def span(self, name: str):
+        """Context manager timing the block it wraps under name."""
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float, **fields):
+        """Add one timing; extra fields only go to the trace."""
+        now = time.time()
+        self.timings.append((name, now, seconds))
+        if self._trace is not None:
+            self._write({'t': now, 'op': name, 'ms': round(seconds * 1000, 3), **fields})
+
+    def count(self, name: str, hit: bool):
+        """Count a hit or a miss of the cache called name."""
+        counter = self.counters.setdefault(name, [0, 0])
+        counter[0 if hit else 1] += 1
+
+    def sample(self, **values):
+        """Update gauges such as memory held, adding the process RSS."""
+        values['rss'] = current_rss()
+        self.gauges.update(values)
+        if self._trace is not None:
+            hit_rates = {name: self.hit_rate(name) for name in list(self.counters)}
+            self._write({'t': time.time(), 'gauges': values, 'hit_rates': hit_rates})
+
+    def hit_rate(self, name: str):
+        """Fraction of hits of the cache called name, or None before any lookup."""
+        hits, misses = self.counters.get(name, (0, 0))
+        return hits / (hits + misses) if hits + misses else None
+
+    def summary(self):
+        """Per operation in the ring buffer: (name, count, mean, p95, last) in ms."""
+        durations = {}
+        for name, _, seconds in list(self.timings):
+            durations.setdefault(name, []).append(seconds * 1000)
+        result = []
+        for name, values in sorted(durations.items()):
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            result.append((name, len(values), sum(values) / len(values), p95, values[-1]))
+        return result
+
+# Shared by everything in the process; READER_TRACE names a file (or - for
+# stderr) that receives the same data as JSON lines
+recorder = Recorder(trace=os.environ.get('READER_TRACE'))
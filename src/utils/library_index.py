@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from utils.disk_cache import cache_root
+
+# One document of the library. position is where reading stopped, in the
+# viewer's own terms, and progress the same as a fraction of the document.
+Document = namedtuple('Document', [
+    'path', 'size', 'mtime_ns', 'kind', 'title', 'authors', 'pages', 'cover',
+    'package', 'error', 'position', 'progress',
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    kind TEXT,
+    title TEXT,
+    authors TEXT,
+    pages INTEGER,
+    cover BLOB,
+    package TEXT,
+    error TEXT,
+    position REAL,
+    progress REAL
+)
+"""
+
+def library_path() -> Path:
+    return cache_root() / 'library.sqlite3'
+
+def document_key(file_path: str) -> str:
+    """How a document is identified in the index."""
+    return os.path.abspath(file_path)
+
+class LibraryIndex:
+    """Metadata and reading positions of documents, kept in SQLite.
+
+    Every document is stored with the size and modification time it had
+    when its metadata was extracted, so a scan only has to extract files
+    whose size or mtime changed. Safe to use from several threads.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path is not None else library_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(SCHEMA)
+
+    def _document(self, row) -> Document:
+        document = Document(*row)
+        if document.package:
+            document = document._replace(package=json.loads(document.package))
+        return document
+
+    def get(self, file_path: str):
+        """The Document for a file, or None if it was never seen."""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(Document._fields)} FROM documents WHERE path = ?",
+                (document_key(file_path),)).fetchone()
+        return self._document(row) if row else None
+
+    def documents(self, roots=None):
+        """Documents under roots (everything by default) with known metadata, by title.
+
+        Covers and EPUB packages are left out, since a large library has a
+        lot of them; cover() and get() fetch the ones actually needed.
+        """
+        fields = ', '.join('NULL' if field in ('cover', 'package') else field for field in Document._fields)
+        query = f"SELECT {fields} FROM documents WHERE size IS NOT NULL"
+        with self._lock:
+            rows = self._db.execute(query).fetchall()
+        if roots is not None:
+            prefixes = tuple(os.path.join(document_key(root), '') for root in roots)
+            rows = [row for row in rows if row[0].startswith(prefixes)]
+        documents = [self._document(row) for row in rows]
+        documents.sort(key=lambda d: ((d.title or '').lower(), d.path))
+        return documents
+
+    def cover(self, file_path: str):
+        """PNG thumbnail of a document's cover, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cover FROM documents WHERE path = ?", (document_key(file_path),)).fetchone()
+        return row[0] if row else None
+
+    def stats(self, roots):
+        """path -> (size, mtime_ns) for every document indexed under roots."""
+        prefixes = tuple(os.path.join(document_key(root), '') for root in roots)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, size, mtime_ns FROM documents WHERE size IS NOT NULL").fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows if path.startswith(prefixes)}
+
+    def update(self, entries):
+        """Store extracted metadata; reading positions are left alone.
+
+        entries are dicts with path, size, mtime_ns, kind, title, authors
+        (a list), pages, cover (PNG bytes), package and error.
+        """
+        rows = [(
+            e['path'], e['size'], e['mtime_ns'], e['kind'], e.get('title'),
+            ', '.join(e.get('authors') or []), e.get('pages'), e.get('cover'),
+            json.dumps(e['package']) if e.get('package') else None, e.get('error'),
+        ) for e in entries]
+        with self._lock, self._db:
+            self._db.executemany("""
+                INSERT INTO documents (path, size, mtime_ns, kind, title, authors, pages, cover, package, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, kind = excluded.kind,
+                    title = excluded.title, authors = excluded.authors, pages = excluded.pages,
+                    cover = excluded.cover, package = excluded.package, error = excluded.error
+            """, rows)
+
+    def remove(self, paths):
+        """Forget documents that are gone, reading positions included."""
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM documents WHERE path = ?", [(path,) for path in paths])
+
+    def save_position(self, file_path: str, position: float, progress: float):
+        """Remember where reading stopped, for documents outside the library too."""
+        with self._lock, self._db:
+            self._db.execute("""
+                INSERT INTO documents (path, position, progress) VALUES (?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET position = excluded.position, progress = excluded.progress
+            """, (document_key(file_path), position, progress))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
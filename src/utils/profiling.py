@@ -0,0 +1,36 @@
+import sys
+import time
+
+class StartupProfiler:
+    """Records named startup phases and reports how long each one took.
+
+    A disabled profiler ignores marks, so callers can mark phases
+    unconditionally.
+    """
+
+    def __init__(self, start: float = None, enabled: bool = True):
+        self.enabled = enabled
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []  # (phase, perf_counter timestamp)
+
+    def mark(self, phase: str):
+        """Record that phase has just finished."""
+        if self.enabled:
+            self.marks.append((phase, time.perf_counter()))
+
+    def phases(self):
+        """(phase, duration, elapsed since start) in seconds, in marking order."""
+        result = []
+        previous = self.start
+        for phase, stamp in self.marks:
+            result.append((phase, stamp - previous, stamp - self.start))
+            previous = stamp
+        return result
+
+    def report(self, stream=None):
+        """Write one line per phase with its duration and the running total."""
+        stream = stream or sys.stderr
+        stream.write(f"{'phase':<20} {'took':>10} {'total':>10}\n")
+        for phase, duration, elapsed in self.phases():
+            stream.write(f"{phase:<20} {duration * 1000:>7.1f} ms {elapsed * 1000:>7.1f} ms\n")
+        stream.flush()
@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from utils.disk_cache import cache_root
+
+WORD_RE = re.compile(r'\w+')
+FORMAT_VERSION = 1
+
+def tokenize(text: str):
+    """Lower-cased words of text, in order."""
+    return [word.lower() for word in WORD_RE.findall(text)]
+
+def index_path(file_path: str) -> Path:
+    """Where the index for a document lives, next to the page cache."""
+    key = hashlib.blake2b(str(Path(file_path).resolve()).encode('utf-8'), digest_size=16).hexdigest()
+    return cache_root() / 'search' / f"{key}.json.gz"
+
+class SearchIndex:
+    """Inverted index from words to the pages and word positions they occur at.
+
+    Pages can be added in any order and searched while the rest of the
+    document is still being indexed. Every page remembers a digest of its
+    text, so re-indexing a changed file only rewrites the pages whose text
+    actually changed. All methods are safe to call from several threads.
+    """
+
+    def __init__(self, page_count: int = 0):
+        self.page_count = page_count
+        self.source = None  # (size, mtime_ns) of the file the index was built from
+        self._postings = {}  # word -> {page: [positions]}
+        self._page_words = {}  # page -> words on it, for removal
+        self._digests = {}  # page -> digest of its text
+        self._lock = threading.Lock()
+
+    @property
+    def indexed_pages(self) -> int:
+        return len(self._digests)
+
+    @property
+    def complete(self) -> bool:
+        return self.indexed_pages >= self.page_count
+
+    def digest(self, page: int):
+        return self._digests.get(page)
+
+    def add_page(self, page: int, text: str) -> bool:
+        """Index the text of a page; returns False if it was already up to date."""
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+        if self._digests.get(page) == digest:
+            return False
+        words = tokenize(text)
+        positions = {}
+        for position, word in enumerate(words):
+            positions.setdefault(word, []).append(position)
+        with self._lock:
+            self._remove_page(page)
+            for word, places in positions.items():
+                self._postings.setdefault(word, {})[page] = places
+            self._page_words[page] = list(positions)
+            self._digests[page] = digest
+        return True
+
+    def _remove_page(self, page: int):
+        for word in self._page_words.pop(page, ()):
+            pages = self._postings.get(word)
+            if pages is not None:
+                pages.pop(page, None)
+                if not pages:
+                    del self._postings[word]
+        self._digests.pop(page, None)
+
+    def truncate(self, page_count: int):
+        """Forget pages past the end of a document that got shorter."""
+        with self._lock:
+            for page in [p for p in self._digests if p >= page_count]:
+                self._remove_page(page)
+            self.page_count = page_count
+
+    def search(self, query: str):
+        """Sorted pages containing every word of query as a phrase.
+
+        Returns (page, hits) pairs, hits being the number of matches on that
+        page. Only pages indexed so far are considered.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            postings = [self._postings.get(word) for word in words]
+            if not all(postings):
+                return []
+            # Intersect starting from the rarest word
+            pages = set(min(postings, key=len))
+            for pages_of_word in postings:
+                pages.intersection_update(pages_of_word)
+            results = []
+            for page in sorted(pages):
+                starts = set(postings[0][page])
+                for offset, pages_of_word in enumerate(postings[1:], 1):
+                    starts.intersection_update(p - offset for p in pages_of_word[page])
+                if starts:
+                    results.append((page, len(starts)))
+        return results
+
+    def save(self, path: Path):
+        """Write the index atomically as compressed JSON."""
+        with self._lock:
+            data = {
+                'version': FORMAT_VERSION,
+                'page_count': self.page_count,
+                'source': self.source,
+                'digests': self._digests,
+                'postings': self._postings,
+            }
+            payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with gzip.open(tmp, 'wb', compresslevel=1) as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path):
+        """Read an index written by save, or None if there is no usable one."""
+        try:
+            with gzip.open(path, 'rb') as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError, EOFError):
+            return None
+        if data.get('version') != FORMAT_VERSION:
+            return None
+        index = cls(data['page_count'])
+        index.source = tuple(data['source']) if data.get('source') else None
+        # JSON object keys are strings; pages are ints everywhere else
+        index._digests = {int(page): digest for page, digest in data['digests'].items()}
+        for word, pages in data['postings'].items():
+            index._postings[word] = {int(page): places for page, places in pages.items()}
+            for page in index._postings[word]:
+                index._page_words.setdefault(page, []).append(word)
+        return index
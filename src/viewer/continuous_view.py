@@ -0,0 +1,165 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from PySide6.QtWidgets import QAbstractScrollArea
+from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect, QSize, Signal
+from PySide6.QtGui import QPainter
+
+from viewer.page_canvas import HIGHLIGHT_COLOR
+
+class ContinuousView(QAbstractScrollArea):
+    """Every page of a document in one vertical strip, painted on demand.
+
+    Page geometry is computed once from the page sizes, so jumping to a page
+    or a scroll fraction is a lookup. Nothing is kept per page except its
+    size: pixmap_source(index) is asked for the pages inside the viewport at
+    paint time and returns a pixmap, or None while the page is rendering.
+    highlight_source(index, rect), if given, returns polygons to highlight on
+    a page drawn at rect.
+    """
+
+    page_changed = Signal(int)
+
+    gap = 12  # Pixels between pages
+
+    # Keys handled by ReaderWindow rather than by scrolling
+    window_keys = (Qt.Key_Space, Qt.Key_Backspace, Qt.Key_Left, Qt.Key_Right)
+
+    def __init__(self, page_sizes, pixmap_source, highlight_source=None, parent=None):
+        super().__init__(parent)
+        self.page_sizes = page_sizes  # QSize per page at zoom 1
+        self.pixmap_source = pixmap_source
+        self.highlight_source = highlight_source
+        self.zoom = 1.0
+        self.current_page = 0
+        self._offsets = [0]
+        self._widths = []
+        self._animation = QPropertyAnimation(self.verticalScrollBar(), b'value', self)
+        self._animation.setDuration(150)
+        self._animation.setEasingCurve(QEasingCurve.OutCubic)
+        self.verticalScrollBar().setSingleStep(40)
+        self.horizontalScrollBar().setSingleStep(40)
+        self.viewport().setAutoFillBackground(False)
+        self._layout_pages()
+
+    def _layout_pages(self):
+        """Recompute page offsets for the current zoom."""
+        self._widths = [round(size.width() * self.zoom) for size in self.page_sizes]
+        heights = [round(size.height() * self.zoom) + self.gap for size in self.page_sizes]
+        self._offsets = list(accumulate(heights, initial=0))
+        self._update_scroll_bars()
+
+    def _update_scroll_bars(self):
+        viewport = self.viewport().size()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, self._offsets[-1] - viewport.height()))
+        vbar.setPageStep(viewport.height())
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, max(self._widths, default=0) - viewport.width()))
+        hbar.setPageStep(viewport.width())
+
+    def page_rect(self, index: int) -> QRect:
+        """Where page index currently is, in viewport coordinates."""
+        width = self._widths[index]
+        content_width = max(max(self._widths, default=0), self.viewport().width())
+        x = (content_width - width) // 2 - self.horizontalScrollBar().value()
+        y = self._offsets[index] - self.verticalScrollBar().value()
+        return QRect(x, y, width, self._offsets[index + 1] - self._offsets[index] - self.gap)
+
+    def page_at(self, y: int) -> int:
+        """Index of the page at content position y."""
+        index = bisect_right(self._offsets, y) - 1
+        return min(max(index, 0), len(self.page_sizes) - 1)
+
+    def visible_pages(self) -> range:
+        top = self.verticalScrollBar().value()
+        return range(self.page_at(top), self.page_at(top + self.viewport().height()) + 1)
+
+    def scroll_to_page(self, index: int, animate: bool = True):
+        """Bring the top of page index to the top of the viewport."""
+        index = min(max(index, 0), len(self.page_sizes) - 1)
+        self._scroll_to(self._offsets[index], animate)
+
+    def scroll_to_fraction(self, fraction: float, animate: bool = False):
+        """Scroll to a position given as a fraction of the whole document."""
+        self._scroll_to(round(min(max(fraction, 0.0), 1.0) * self.verticalScrollBar().maximum()), animate)
+
+    def _scroll_to(self, value: int, animate: bool):
+        self._animation.stop()
+        if animate:
+            self._animation.setStartValue(self.verticalScrollBar().value())
+            self._animation.setEndValue(value)
+            self._animation.start()
+        else:
+            self.verticalScrollBar().setValue(value)
+
+    def set_zoom(self, zoom: float):
+        """Change the zoom, keeping the same spot of the current page on top."""
+        top = self.verticalScrollBar().value()
+        index = self.page_at(top)
+        page_height = max(1, self._offsets[index + 1] - self._offsets[index])
+        within = (top - self._offsets[index]) / page_height
+        self.zoom = zoom
+        self._layout_pages()
+        page_height = self._offsets[index + 1] - self._offsets[index]
+        self.verticalScrollBar().setValue(self._offsets[index] + round(within * page_height))
+        self.viewport().update()
+
+    def _target_page(self) -> int:
+        """Page being read: the one at the top, or the one an animation heads for."""
+        if self._animation.state() == QPropertyAnimation.Running:
+            return self.page_at(self._animation.endValue())
+        return self.page_at(self.verticalScrollBar().value() + self.gap)
+
+    def next_page(self):
+        self.scroll_to_page(self._target_page() + 1)
+
+    def previous_page(self):
+        index = self._target_page()
+        top = self.verticalScrollBar().value()
+        # From the middle of a page, go back to its top first
+        if self._animation.state() != QPropertyAnimation.Running and top > self._offsets[index] + self.gap:
+            self.scroll_to_page(index)
+        else:
+            self.scroll_to_page(index - 1)
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+        index = self.page_at(self.verticalScrollBar().value() + self.gap)
+        if index != self.current_page:
+            self.current_page = index
+            self.page_changed.emit(index)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_bars()
+
+    def keyPressEvent(self, event):
+        if event.key() in self.window_keys:
+            event.ignore()  # Let ReaderWindow turn the page
+            return
+        super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), Qt.darkGray)
+        for index in self.visible_pages():
+            rect = self.page_rect(index)
+            if not rect.intersects(event.rect()):
+                continue
+            pixmap = self.pixmap_source(index)
+            if pixmap is None:
+                painter.fillRect(rect, Qt.white)
+            else:
+                painter.drawPixmap(rect, pixmap)
+            if self.highlight_source is not None:
+                polygons = self.highlight_source(index, rect)
+                if polygons:
+                    painter.setPen(Qt.NoPen)
+                    painter.setBrush(HIGHLIGHT_COLOR)
+                    for polygon in polygons:
+                        painter.drawPolygon(polygon)
+        painter.end()
+
+    def sizeHint(self):
+        return QSize(max(self._widths, default=400), 1080)
@@ -0,0 +1,58 @@
+from PySide6.QtWidgets import QLabel
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFontDatabase
+
+from utils.instrumentation import current_rss, recorder
+
+def format_bytes(size) -> str:
+    if size is None:
+        return "n/a"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+class DebugOverlay(QLabel):
+    """Render timings, cache hit rates and memory drawn over the document.
+
+    The numbers come from the shared recorder and are refreshed twice a
+    second while the overlay is shown; a hidden overlay costs nothing.
+    """
+
+    refresh_ms = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setStyleSheet("background: rgba(0, 0, 0, 180); color: white; padding: 6px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self._timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self._timer.start(self.refresh_ms)
+
+    def refresh(self):
+        lines = [f"{'operation':<26} {'n':>5} {'mean':>8} {'p95':>8} {'last':>8}"]
+        for name, count, mean, p95, last in recorder.summary():
+            lines.append(f"{name:<26} {count:>5} {mean:>6.1f}ms {p95:>6.1f}ms {last:>6.1f}ms")
+        lines.append("")
+        for name in sorted(recorder.counters):
+            rate = recorder.hit_rate(name)
+            hits, misses = recorder.counters[name]
+            lines.append(f"{name + ' hits':<26} {rate * 100:>5.0f}% ({hits}/{hits + misses})")
+        gauges = recorder.gauges
+        if 'pixmap_bytes' in gauges:
+            lines.append(f"{'pixmaps held':<26} {format_bytes(gauges['pixmap_bytes'])} in {gauges.get('pixmaps', 0)}")
+        if 'chapter_bytes' in gauges:
+            lines.append(f"{'chapters held':<26} {format_bytes(gauges['chapter_bytes'])} in {gauges.get('chapters', 0)}")
+        lines.append(f"{'process RSS':<26} {format_bytes(current_rss())}")
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+        self.move(8, 8)
+        self.raise_()
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+import io
+import mimetypes
+import mmap
+import posixpath
+import threading
+import zipfile
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+CONTAINER_PATH = 'META-INF/container.xml'
+NS = {
+    'container': 'urn:oasis:names:tc:opendocument:xmlns:container',
+    'opf': 'http://www.idpf.org/2007/opf',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+
+class _MappedFile(io.RawIOBase):
+    """Seekable read-only file over an mmap, as zipfile expects."""
+
+    def __init__(self, mapping):
+        super().__init__()
+        self._map = mapping
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def tell(self):
+        return self._map.tell()
+
+    def read(self, size=-1):
+        return self._map.read(size if size is not None and size >= 0 else None)
+
+    def readinto(self, buffer):
+        data = self._map.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+class EpubArchive:
+    """An EPUB opened lazily, member by member.
+
+    Opening reads only the zip central directory, container.xml and the OPF
+    package document. Chapters and resources are decompressed when first
+    asked for and kept in a small LRU cache bounded by size in bytes.
+    Members are addressed by their full path inside the zip.
+    Passing the package from an earlier open skips parsing the OPF again.
+    """
+
+    def __init__(self, file_path: str, cache_bytes: int = 32 * 1024 * 1024, use_mmap: bool = True, package: dict = None):
+        self.file_path = file_path
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._file = open(file_path, 'rb')
+        self._map = None
+        if use_mmap:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self._map = None  # Empty files and some filesystems cannot be mapped
+        try:
+            self._zip = zipfile.ZipFile(_MappedFile(self._map) if self._map is not None else self._file)
+            if package is not None:
+                # Parsed before, e.g. by a library scan
+                self._set_package(package)
+            else:
+                self._read_package()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_package(self):
+        """Parse the container, OPF metadata, manifest and spine."""
+        container = ElementTree.fromstring(self._zip.read(CONTAINER_PATH))
+        rootfile = container.find('.//container:rootfile', NS)
+        if rootfile is None:
+            raise ValueError(f"No rootfile in {CONTAINER_PATH}")
+        self.opf_path = rootfile.get('full-path')
+        opf_dir = posixpath.dirname(self.opf_path)
+        package = ElementTree.fromstring(self._zip.read(self.opf_path))
+
+        metadata = package.find('opf:metadata', NS)
+        self.title = None
+        self.authors = []
+        if metadata is not None:
+            title = metadata.find('dc:title', NS)
+            self.title = title.text.strip() if title is not None and title.text else None
+            self.authors = [c.text.strip() for c in metadata.findall('dc:creator', NS) if c.text]
+
+        # Manifest ids map to member paths, which is what the rest of the viewer uses
+        self.media_types = {}
+        self.cover = None
+        manifest = {}
+        for item in package.iterfind('opf:manifest/opf:item', NS):
+            name = posixpath.normpath(posixpath.join(opf_dir, unquote(item.get('href', ''))))
+            manifest[item.get('id')] = name
+            self.media_types[name] = item.get('media-type')
+            if 'cover-image' in (item.get('properties') or '').split():
+                self.cover = name
+        if self.cover is None and metadata is not None:
+            # EPUB 2 names the cover in a <meta name="cover"> entry
+            meta = metadata.find("opf:meta[@name='cover']", NS)
+            if meta is not None:
+                self.cover = manifest.get(meta.get('content'))
+
+        self.spine = [
+            manifest[ref.get('idref')]
+            for ref in package.iterfind('opf:spine/opf:itemref', NS)
+            if ref.get('idref') in manifest
+        ]
+
+    @property
+    def package(self) -> dict:
+        """What _read_package found, as plain data that can be stored."""
+        return {
+            'opf_path': self.opf_path,
+            'title': self.title,
+            'authors': self.authors,
+            'media_types': self.media_types,
+            'cover': self.cover,
+            'spine': self.spine,
+        }
+
+    def _set_package(self, package: dict):
+        self.opf_path = package['opf_path']
+        self.title = package['title']
+        self.authors = package['authors']
+        self.media_types = package['media_types']
+        self.cover = package['cover']
+        self.spine = package['spine']
+
+    def media_type(self, name: str) -> str:
+        """Media type from the manifest, guessed from the extension otherwise."""
+        media_type = self.media_types.get(name)
+        if media_type is None:
+            media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return media_type
+
+    def read(self, name: str) -> bytes:
+        """Decompressed content of a member; raises KeyError if it is missing."""
+        with self._lock:
+            data = self._cache.get(name)
+            if data is not None:
+                self._cache.move_to_end(name)
+                return data
+            data = self._zip.read(name)
+            if len(data) <= self.cache_bytes:
+                self._cache[name] = data
+                self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+            return data
+
+    def close(self):
+        """Release the zip file, the mapping and the file handle."""
+        with self._lock:
+            self._cache.clear()
+            self._cached_bytes = 0
+            if getattr(self, '_zip', None) is not None:
+                self._zip.close()
+                self._zip = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
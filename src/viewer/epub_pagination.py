@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+
+from PySide6.QtCore import QObject
+
+from utils.disk_cache import cache_root
+from viewer.epub_scheme import book_url
+
+# Chapters are laid out in columns exactly one screen wide (see READER_STYLE),
+# so the number of screens is the scroll width in viewport widths
+SCREEN_COUNT_JS = "Math.max(1, Math.ceil((document.documentElement.scrollWidth - 1) / window.innerWidth))"
+
+def pagination_path(file_path: str) -> Path:
+    """Where screen counts for a book are kept, per version of the file."""
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = hashlib.blake2b(f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'), digest_size=16).hexdigest()
+    return cache_root() / 'pagination' / f"{key}.json"
+
+class EpubPaginator(QObject):
+    """Counts the screens of every chapter with a hidden web view.
+
+    The hidden view has the reader's size and settings and loads one chapter
+    after another. Counts are cached on disk per layout, so a book opened
+    again at the same window size is paginated at once. With every chapter
+    counted, converting between a position in the book and (chapter, screen)
+    is a bisect over prefix sums; before that, uncounted chapters are
+    estimated from the counted ones.
+    """
+
+    # Layouts (window sizes and settings) remembered per book
+    max_layouts = 8
+
+    def __init__(self, file_path: str, view, chapters, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.chapters = chapters
+        self.layout_key = None
+        self.counts = [None] * len(chapters)
+        self._offsets = None
+        self._queue = []
+        self._loading = None  # (chapter, layout key) being measured
+        try:
+            self.path = pagination_path(file_path)
+        except OSError:
+            self.path = None
+        self.view.loadFinished.connect(self._on_load_finished)
+
+    def start(self, layout_key: str):
+        """Paginate for a layout, unless that is the one already done or underway."""
+        if layout_key == self.layout_key:
+            return
+        self.layout_key = layout_key
+        self._offsets = None
+        saved = self._read_saved().get(layout_key)
+        if saved is not None and len(saved) == len(self.chapters):
+            self.counts = saved
+            self._queue = []
+            self._finish(save=False)
+            return
+        self.counts = [None] * len(self.chapters)
+        self._queue = list(range(len(self.chapters)))
+        # A load already underway is finished first and its count dropped
+        if self._loading is None:
+            self._next()
+
+    def stop(self):
+        self._queue = []
+        self.view.stop()
+
+    def set_count(self, chapter: int, count: int, layout_key: str):
+        """Record a count measured elsewhere, e.g. by the visible view."""
+        if layout_key == self.layout_key and self.counts[chapter] is None:
+            self.counts[chapter] = count
+            if self._queue and all(c is not None for c in self.counts):
+                self._queue = []
+                self._finish()
+
+    def _next(self):
+        while self._queue and self.counts[self._queue[0]] is not None:
+            self._queue.pop(0)
+        if not self._queue:
+            if self._offsets is None and all(c is not None for c in self.counts):
+                self._finish()
+            return
+        chapter = self._queue.pop(0)
+        self._loading = (chapter, self.layout_key)
+        self.view.setUrl(book_url(self.chapters[chapter], layout=True))
+
+    def _on_load_finished(self, ok: bool):
+        if self._loading is None:
+            return
+        chapter, layout_key = self._loading
+        if not ok:
+            self._store(chapter, layout_key, 1)  # Broken chapters get one screen
+            return
+        self.view.page().runJavaScript(
+            SCREEN_COUNT_JS, 0, lambda count: self._store(chapter, layout_key, count))
+
+    def _store(self, chapter: int, layout_key: str, count):
+        self._loading = None
+        if layout_key == self.layout_key:
+            self.counts[chapter] = max(1, int(count or 1))
+        self._next()
+
+    def _finish(self, save: bool = True):
+        self._offsets = list(accumulate(self.counts, initial=0))
+        if save:
+            self._save()
+
+    def _read_saved(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        layouts = self._read_saved()
+        layouts.pop(self.layout_key, None)
+        layouts[self.layout_key] = self.counts
+        # Keep the most recently used layouts; dicts remember insertion order
+        for key in list(layouts)[:-self.max_layouts]:
+            del layouts[key]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(layouts))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # Pagination simply runs again next time
+
+    def _positions(self):
+        """Prefix sums of screens per chapter, estimating uncounted chapters."""
+        if self._offsets is not None:
+            return self._offsets
+        known = [c for c in self.counts if c is not None]
+        estimate = round(sum(known) / len(known)) if known else 1
+        return list(accumulate((estimate if c is None else c for c in self.counts), initial=0))
+
+    def locate(self, fraction: float):
+        """(chapter, screen) at a fraction of the book."""
+        positions = self._positions()
+        if not self.chapters:
+            return 0, 0
+        target = min(int(min(max(fraction, 0.0), 1.0) * positions[-1]), positions[-1] - 1)
+        chapter = min(bisect_right(positions, target) - 1, len(self.chapters) - 1)
+        return chapter, target - positions[chapter]
+
+    def fraction(self, chapter: int, screen: int) -> float:
+        """Position of a screen as a fraction of the book."""
+        positions = self._positions()
+        return (positions[chapter] + screen) / max(positions[-1], 1)
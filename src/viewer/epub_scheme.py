@@ -0,0 +1,67 @@
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QUrl, QUrlQuery
+from PySide6.QtWebEngineCore import (
+    QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler,
+)
+from urllib.parse import quote
+
+SCHEME_NAME = b'epub'
+BOOK_HOST = 'book'
+# Query item marking chapters loaded only to be laid out, not read
+LAYOUT_QUERY = 'layout'
+
+def register_epub_scheme():
+    """Register the epub:// scheme with the web engine.
+
+    Qt only accepts new schemes before the web engine has started, so this
+    has to run before the first QWebEngineView or profile is created.
+    """
+    if QWebEngineUrlScheme.schemeByName(SCHEME_NAME).name() == SCHEME_NAME:
+        return
+    scheme = QWebEngineUrlScheme(SCHEME_NAME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalScheme
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+def book_url(name: str, layout: bool = False) -> QUrl:
+    """URL under which the archive member name is served.
+
+    layout marks a load by pagination rather than by the reader; resources
+    the chapter refers to are requested without the mark.
+    """
+    url = f"{SCHEME_NAME.decode()}://{BOOK_HOST}/{quote(name)}"
+    if layout:
+        url += f"?{LAYOUT_QUERY}"
+    return QUrl(url)
+
+class EpubSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Serves chapters and resources of an open book straight from memory.
+
+    resolve(name, layout) returns (content, media_type) for an archive member
+    path, or None when the book has no such member; layout tells whether the
+    URL came from book_url(name, layout=True).
+    """
+
+    def __init__(self, resolve, parent=None):
+        super().__init__(parent)
+        self.resolve = resolve
+
+    def requestStarted(self, job: QWebEngineUrlRequestJob):
+        url = job.requestUrl()
+        if url.host() != BOOK_HOST:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        layout = QUrlQuery(url).hasQueryItem(LAYOUT_QUERY)
+        resource = self.resolve(url.path(QUrl.FullyDecoded).lstrip('/'), layout)
+        if resource is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        content, media_type = resource
+        # The job takes ownership of the buffer and deletes it with itself
+        buffer = QBuffer(job)
+        buffer.setData(QByteArray(content))
+        buffer.open(QIODevice.ReadOnly)
+        job.reply(media_type.encode(), buffer)
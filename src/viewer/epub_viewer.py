@@ -1,17 +1,66 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtCore import Qt, QUrl, QSize
+from PySide6.QtCore import Qt, QUrl, QSize, QTimer, Signal
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWebEngineCore import QWebEnginePage
-import ebooklib
-from ebooklib import epub
+from PySide6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile, QWebEngineSettings
 from bs4 import BeautifulSoup
-import tempfile
-import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
+import time
 from pathlib import Path
 
+from utils.concurrency import cancel_pending
+from utils.instrumentation import recorder
+from viewer.epub_archive import EpubArchive
+from viewer.epub_pagination import SCREEN_COUNT_JS, EpubPaginator
+from viewer.epub_scheme import SCHEME_NAME, EpubSchemeHandler, book_url, register_epub_scheme
+from viewer.search import SearchIndexer
+
+# The scheme has to be known before the web engine starts up
+register_epub_scheme()
+
+# Styling injected into every chapter. Chapters are laid out in columns of
+# at most 800px of text, and a column plus the gap after it is exactly one
+# viewport wide, so turning a screen is scrolling by the viewport width.
+READER_STYLE = """
+    html {
+        height: 100%;
+        overflow: hidden;
+        --side: max(20px, calc((100vw - 800px) / 2));
+    }
+    body {
+        margin: 0;
+        height: 100vh;
+        box-sizing: border-box;
+        padding: 20px var(--side);
+        column-width: calc(100vw - 2 * var(--side));
+        column-gap: calc(2 * var(--side));
+        column-fill: auto;
+        font-family: system-ui, -apple-system, sans-serif;
+        line-height: 1.6;
+    }
+    img { max-width: 100%; max-height: calc(100vh - 40px); height: auto; }
+"""
+STYLE_DIGEST = hashlib.blake2b(READER_STYLE.encode('utf-8'), digest_size=8).hexdigest()
+
+# Pagination waits this long after the last resize
+REPAGINATE_DELAY = 300
+
+def epub_text_source(file_path: str, package: dict = None):
+    """Text source for SearchIndexer: one page per spine chapter."""
+    def open_source():
+        archive = EpubArchive(file_path, cache_bytes=0, package=package)
+
+        def extract(chapter: int) -> str:
+            return BeautifulSoup(archive.read(archive.spine[chapter]), 'html.parser').get_text(' ')
+
+        return len(archive.spine), extract, archive.close
+    return open_source
+
 class CustomWebPage(QWebEnginePage):
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self, profile, parent=None):
+        super().__init__(profile, parent)
         self.setBackgroundColor(Qt.white)
     
     def javaScriptConsoleMessage(self, level, message, line, source):
@@ -19,89 +68,312 @@ class CustomWebPage(QWebEnginePage):
         pass
 
 class EpubViewer(QWidget):
-    def __init__(self, file_path: str):
+    """Shows an ePub one screen at a time.
+
+    current_page is the spine chapter on screen and screen the screen within
+    it. A hidden view of the same size counts the screens of every chapter in
+    the background, which gives positions in the whole book.
+    """
+
+    first_frame = Signal()  # Emitted once the first chapter has loaded
+    screen_shown = Signal()  # Emitted once a screen has been scrolled into view
+
+    # Processed chapters kept in memory, in bytes of XHTML
+    chapter_cache_bytes = 16 * 1024 * 1024
+
+    def __init__(self, file_path: str, package: dict = None, position: float = None):
         super().__init__()
         self.current_page = 0
+        self.screen = 0
+        self.screens = None  # Screens in the chapter on display, once laid out
+        self._target_screen = 0  # Screen to show once the chapter loads; -1 is the last
+        self._target_within = None  # Or the fraction of the chapter to show
+        self._loaded_chapter = None
         self.book = None
         self.spine_items = []
-        self.temp_dir = None
+        self._chapter_names = set()
+
+        # Processed chapter XHTML by archive name, least recently used first
+        self._chapters = OrderedDict()
+        self._chapter_bytes = 0
+        self._chapters_lock = threading.Lock()
+        self._preloader = ThreadPoolExecutor(max_workers=1)
+        self._preloads = set()  # Futures not done yet, cancelled on cleanup
         
         # Set up layout
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(self.layout)
         
-        # Create web view
-        self.web_view = QWebEngineView()
-        self.web_view.setPage(CustomWebPage(self.web_view))
+        # Create web view. The private profile is created after the views so
+        # that their pages are destroyed before the profile they belong to.
+        self.web_view = QWebEngineView(self)
+        # Pagination lays chapters out in a second view kept behind the first
+        self.layout_view = QWebEngineView(self)
+        self.layout_view.setFocusPolicy(Qt.NoFocus)
+        self.layout_view.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.layout_view.lower()
+        self.profile = QWebEngineProfile(self)
+        self.scheme_handler = EpubSchemeHandler(self.resource, self)
+        self.profile.installUrlSchemeHandler(SCHEME_NAME, self.scheme_handler)
+        self.web_view.setPage(CustomWebPage(self.profile, self.web_view))
+        self.layout_view.setPage(CustomWebPage(self.profile, self.layout_view))
         self.web_view.setContextMenuPolicy(Qt.NoContextMenu)
+        self.web_view.loadFinished.connect(self._on_first_load)
+        self.web_view.loadFinished.connect(self._on_load_finished)
+        self._pending_find = None
+        self._load_started = None
         self.layout.addWidget(self.web_view)
         
-        # Load document
-        self.load_document(file_path)
+        self._layout_timer = QTimer(self)
+        self._layout_timer.setSingleShot(True)
+        self._layout_timer.setInterval(REPAGINATE_DELAY)
+        self._layout_timer.timeout.connect(self._repaginate)
+
+        # Load document; a package from the library saves parsing the OPF
+        self.load_document(file_path, package, position)
+        self.paginator = EpubPaginator(file_path, self.layout_view, self.spine_items, self)
+
+        # Index chapter text for search once the first chapter is up
+        self.indexer = SearchIndexer(file_path, epub_text_source(file_path, self.book.package), self)
+        QTimer.singleShot(1000, self.indexer.start)
     
-    def load_document(self, file_path: str):
-        """Load and parse ePub document."""
-        self.book = epub.read_epub(file_path)
+    def load_document(self, file_path: str, package: dict = None, position: float = None):
+        """Open the ePub; only the package metadata is read at this point."""
+        self.book = EpubArchive(file_path, package=package)
         self.spine_items = list(self.book.spine)
+        self._chapter_names = set(self.spine_items)
         
-        # Create temporary directory for extracted files
-        self.temp_dir = tempfile.mkdtemp()
-        
-        # Extract and process first page
-        self.show_page(0)
+        # Show the first page, or where reading stopped last time
+        self.go_to_position(position or 0.0)
+
+    def _on_first_load(self, ok: bool):
+        self.web_view.loadFinished.disconnect(self._on_first_load)
+        self.first_frame.emit()
+        self._layout_timer.start()
+
+    def _on_load_finished(self, ok: bool):
+        if self._load_started is not None:
+            # Fetching, parsing and laying out the chapter in QtWebEngine
+            recorder.record('webengine load', time.perf_counter() - self._load_started, chapter=self.current_page)
+            self._load_started = None
+            with self._chapters_lock:
+                recorder.sample(chapter_bytes=self._chapter_bytes, chapters=len(self._chapters))
+        self._loaded_chapter = self.current_page
+        self._measure_screens()
+
+    def _layout_key(self) -> str:
+        """Everything the screen count of a chapter depends on."""
+        settings = self.profile.settings()
+        return '|'.join([
+            f"{self.web_view.width()}x{self.web_view.height()}",
+            f"{self.web_view.zoomFactor():.2f}",
+            settings.fontFamily(QWebEngineSettings.StandardFont),
+            str(settings.fontSize(QWebEngineSettings.DefaultFontSize)),
+            STYLE_DIGEST,
+        ])
+
+    def _measure_screens(self, within: float = None):
+        """Count the screens of the chapter on display, then show the wanted one.
+
+        within, if given, is the position in the chapter to keep, as a fraction.
+        """
+        chapter = self.current_page
+        layout_key = self._layout_key()
+        self.web_view.page().runJavaScript(
+            SCREEN_COUNT_JS, 0, lambda count: self._on_screens_measured(chapter, layout_key, count, within))
+
+    def _on_screens_measured(self, chapter: int, layout_key: str, count, within: float = None):
+        if chapter != self.current_page or self._loaded_chapter != chapter:
+            return  # Another chapter was asked for meanwhile
+        self.screens = max(1, int(count or 1))
+        self.paginator.set_count(chapter, self.screens, layout_key)
+        if within is None:
+            within = self._target_within
+        self._target_within = None
+        if within is not None:
+            target = min(int(within * self.screens), self.screens - 1)
+        elif self._target_screen < 0:
+            target = self.screens - 1
+        else:
+            target = min(self._target_screen, self.screens - 1)
+        self._go_to_screen(target)
+        if self._pending_find:
+            self._find(self._pending_find)
+            self._pending_find = None
+
+    def _go_to_screen(self, screen: int):
+        """Scroll to a screen of the current chapter; no layout is involved."""
+        self.screen = screen
+        self._target_screen = screen
+        self.web_view.page().runJavaScript(
+            f"window.scrollTo({screen} * window.innerWidth, 0)", 0, lambda result: self.screen_shown.emit())
+
+    def _find(self, query: str):
+        # Finding scrolls to the match, which may be anywhere; line up on its screen
+        self.web_view.findText(query, QWebEnginePage.FindFlag(0), lambda result: self._snap_to_screen())
+
+    def _snap_to_screen(self):
+        self.web_view.page().runJavaScript(
+            "Math.round(window.scrollX / window.innerWidth)", 0,
+            lambda screen: self._go_to_screen(int(screen or 0)))
+
+    def _repaginate(self):
+        """Count screens for the current size and settings, unless known already."""
+        if self._loaded_chapter is not None and self.screens:
+            # The chapter on display was laid out again too; stay at the same spot
+            self._measure_screens(self.screen / self.screens)
+        self.layout_view.setGeometry(self.web_view.geometry())
+        self.layout_view.setZoomFactor(self.web_view.zoomFactor())
+        self.paginator.start(self._layout_key())
+
+    def resource(self, name: str, layout: bool = False):
+        """Content and media type of an archive member, for the scheme handler.
+
+        Chapters loaded for pagination neither count towards the chapter
+        cache hit rate nor push the reader's chapters out of the cache.
+        """
+        if name in self._chapter_names:
+            if not layout:
+                # Counted here rather than in chapter_html, which preloading also calls
+                with self._chapters_lock:
+                    cached = name in self._chapters
+                recorder.count('chapter cache', cached)
+            return self.chapter_html(name, keep=not layout), 'text/html'
+        try:
+            return self.book.read(name), self.book.media_type(name)
+        except KeyError:
+            return None
+
+    def chapter_html(self, name: str, keep: bool = True) -> bytes:
+        """Chapter markup with reader styling, kept in an LRU cache unless keep is False."""
+        with self._chapters_lock:
+            html = self._chapters.get(name)
+            if html is not None:
+                if keep:
+                    self._chapters.move_to_end(name)
+                return html
+        data = self.book.read(name)
+        with recorder.span('BeautifulSoup parse'):
+            soup = BeautifulSoup(data, 'html.parser')
+        style = soup.new_tag('style')
+        style.string = READER_STYLE
+        if soup.head is None:
+            head = soup.new_tag('head')
+            (soup.html or soup).insert(0, head)
+        soup.head.append(style)
+        with recorder.span('BeautifulSoup serialize'):
+            html = str(soup).encode('utf-8')
+        if keep and len(html) <= self.chapter_cache_bytes:
+            with self._chapters_lock:
+                if name not in self._chapters:
+                    self._chapters[name] = html
+                    self._chapter_bytes += len(html)
+                while self._chapter_bytes > self.chapter_cache_bytes:
+                    _, evicted = self._chapters.popitem(last=False)
+                    self._chapter_bytes -= len(evicted)
+        return html
+
+    def preload(self, page_num: int):
+        """Process a neighbouring chapter in the background."""
+        if 0 <= page_num < len(self.spine_items):
+            future = self._preloader.submit(self.chapter_html, self.spine_items[page_num])
+            self._preloads.add(future)
+            future.add_done_callback(self._preloads.discard)
     
-    def show_page(self, page_num: int):
-        """Display the specified page."""
+    def show_page(self, page_num: int, screen: int = 0):
+        """Display a chapter, at the given screen of it (-1 for the last one)."""
         if not self.book or page_num < 0 or page_num >= len(self.spine_items):
             return
-        
+        if page_num == self._loaded_chapter and self.screens is not None:
+            self._go_to_screen(self.screens - 1 if screen < 0 else min(screen, self.screens - 1))
+            return
+
         self.current_page = page_num
-        item = self.spine_items[page_num]
+        self.screen = 0
+        self.screens = None
+        self._target_screen = screen
+        self._target_within = None
+        self._loaded_chapter = None
         
-        # Get content
-        content = item.get_content()
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Add basic styling
-        style = soup.new_tag('style')
-        style.string = """
-            body {
-                margin: 0;
-                padding: 20px;
-                font-family: system-ui, -apple-system, sans-serif;
-                line-height: 1.6;
-                max-width: 800px;
-                margin: 0 auto;
-            }
-            img { max-width: 100%; height: auto; }
-        """
-        soup.head.append(style)
-        
-        # Convert to file URL
-        temp_file = os.path.join(self.temp_dir, f'page_{page_num}.html')
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(str(soup))
-        
-        # Load in web view
-        self.web_view.setUrl(QUrl.fromLocalFile(temp_file))
+        # Load in web view; relative links to images and CSS resolve inside the book
+        with recorder.span('epub show_page'):
+            self._load_started = time.perf_counter()
+            self.web_view.setUrl(book_url(self.spine_items[page_num]))
+            self.preload(page_num + 1)
+            self.preload(page_num - 1)
     
     def next_page(self):
-        """Go to next page."""
-        if self.current_page < len(self.spine_items) - 1:
+        """Go to the next screen, moving on to the next chapter after the last one."""
+        if self.screens is None:
+            return  # Still laying out the chapter
+        if self.screen < self.screens - 1:
+            self._go_to_screen(self.screen + 1)
+        elif self.current_page < len(self.spine_items) - 1:
             self.show_page(self.current_page + 1)
     
     def previous_page(self):
-        """Go to previous page."""
-        if self.current_page > 0:
-            self.show_page(self.current_page - 1)
+        """Go to the previous screen, ending up on the last screen of the previous chapter."""
+        if self.screens is None:
+            return
+        if self.screen > 0:
+            self._go_to_screen(self.screen - 1)
+        elif self.current_page > 0:
+            self.show_page(self.current_page - 1, -1)
+
+    def go_to_fraction(self, fraction: float):
+        """Jump to a position given as a fraction of the book."""
+        self.show_page(*self.paginator.locate(fraction))
+
+    def position(self) -> float:
+        """Chapter plus the fraction of it read; unlike fraction() it holds for any window size."""
+        return self.current_page + (self.screen / self.screens if self.screens else 0.0)
+
+    def go_to_position(self, position: float):
+        """Go back to a position returned by position()."""
+        chapter = min(max(int(position), 0), len(self.spine_items) - 1)
+        within = position - chapter
+        if chapter == self._loaded_chapter and self.screens is not None:
+            self._go_to_screen(min(int(within * self.screens), self.screens - 1))
+        else:
+            self.show_page(chapter)
+            self._target_within = within
+
+    def fraction(self) -> float:
+        """Position of the screen on display as a fraction of the book."""
+        return self.paginator.fraction(self.current_page, self.screen)
     
+    def search(self, query: str):
+        """Chapters matching query among those indexed so far, as (chapter, hits)."""
+        return self.indexer.index.search(query)
+
+    def show_search_hit(self, chapter: int, query: str):
+        """Go to a chapter with matches and let the web view highlight them."""
+        if chapter == self.current_page:
+            self._find(query)
+        else:
+            self._pending_find = query
+            self.show_page(chapter)
+
+    def clear_search(self):
+        self._pending_find = None
+        self.web_view.findText('')
+
     def cleanup(self):
-        """Clean up temporary files."""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            import shutil
-            shutil.rmtree(self.temp_dir)
+        """Stop background work and close the archive."""
+        self.indexer.stop()
+        self._layout_timer.stop()
+        self.paginator.stop()
+        cancel_pending(self._preloads)
+        self._preloader.shutdown(wait=True)
+        if self.book:
+            self.book.close()
+            self.book = None
     
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._layout_timer.start()
+
     def closeEvent(self, event):
         """Handle window close."""
         self.cleanup()
@@ -109,4 +381,4 @@ class EpubViewer(QWidget):
     
     def sizeHint(self):
         """Return preferred size."""
-        return QSize(800, 600)  # Default size 
\ No newline at end of file
+        return QSize(800, 600)  # Default size
@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from viewer.epub_archive import EpubArchive
+
+EXTENSIONS = ('.pdf', '.epub')
+
+# Height of cover thumbnails in pixels
+THUMBNAIL_HEIGHT = 160
+
+# Directories listed at once; on network shares listing is mostly waiting
+LIST_THREADS = 16
+
+# Files whose metadata is stored in one transaction
+BATCH_SIZE = 64
+
+def _list_dir(directory: str):
+    """What is directly in directory: documents as (path, size, mtime_ns),
+    subdirectories, and paths that could not be read."""
+    files = []
+    subdirs = []
+    unreadable = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(EXTENSIONS):
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    unreadable.append(entry.path)
+    except OSError:
+        unreadable.append(directory)
+    return files, subdirs, unreadable
+
+def walk(roots):
+    """Every document under roots as (path, size, mtime_ns), listing directories
+    in parallel, and the paths that could not be read.
+
+    A missing root, e.g. a network share that is offline, is unreadable too.
+    """
+    found = []
+    unreadable = []
+    with ThreadPoolExecutor(max_workers=LIST_THREADS) as pool:
+        pending = {pool.submit(_list_dir, os.path.abspath(root)) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, failed = future.result()
+                found.extend(files)
+                unreadable.extend(failed)
+                pending.update(pool.submit(_list_dir, subdir) for subdir in subdirs)
+    return found, unreadable
+
+def _thumbnail(document) -> bytes:
+    """PNG of the first page of an open fitz document, THUMBNAIL_HEIGHT high."""
+    page = document[0]
+    zoom = THUMBNAIL_HEIGHT / max(page.rect.height, 1)
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).tobytes('png')
+
+def _pdf_metadata(file_path: str) -> dict:
+    with fitz.open(file_path) as document:
+        metadata = document.metadata or {}
+        author = (metadata.get('author') or '').strip()
+        return {
+            'title': (metadata.get('title') or '').strip() or None,
+            'authors': [author] if author else [],
+            'pages': len(document),
+            'cover': _thumbnail(document) if len(document) else None,
+        }
+
+def _epub_metadata(file_path: str) -> dict:
+    archive = EpubArchive(file_path, cache_bytes=0)
+    try:
+        cover = None
+        if archive.cover:
+            try:
+                # An image opened with fitz is a one-page document
+                with fitz.open(stream=archive.read(archive.cover)) as image:
+                    cover = _thumbnail(image)
+            except Exception:
+                pass  # A broken cover just leaves a placeholder
+        return {
+            'title': archive.title,
+            'authors': archive.authors,
+            'pages': len(archive.spine),
+            'cover': cover,
+            'package': archive.package,
+        }
+    finally:
+        archive.close()
+
+def _broken(entry, error: str) -> dict:
+    """Index entry for a file whose metadata could not be extracted.
+
+    Broken files are stored anyway, so they are not extracted again on every
+    scan; a new size or mtime makes them count as changed once more.
+    """
+    path, size, mtime_ns = entry
+    return {
+        'path': path, 'size': size, 'mtime_ns': mtime_ns,
+        'kind': Path(path).suffix.lower().lstrip('.'), 'title': Path(path).stem, 'error': error,
+    }
+
+def extract_metadata(entry):
+    """Metadata of one file for LibraryIndex.update; runs in a worker process."""
+    path, size, mtime_ns = entry
+    kind = Path(path).suffix.lower().lstrip('.')
+    result = {'path': path, 'size': size, 'mtime_ns': mtime_ns, 'kind': kind}
+    try:
+        result.update(_pdf_metadata(path) if kind == 'pdf' else _epub_metadata(path))
+    except Exception as e:
+        return _broken(entry, str(e) or type(e).__name__)
+    if not result.get('title'):
+        result['title'] = Path(path).stem
+    return result
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # Spawned like the render pool, so workers do not inherit Qt state
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+def _extract_all(entries, workers: int):
+    """Yield the metadata of every entry, in no particular order.
+
+    A file can crash MuPDF and with it the worker process, which breaks the
+    whole pool. Every file that was in flight then is a suspect: the others
+    carry on in a fresh pool, and the suspects are retried one at a time in a
+    pool of their own, where the one that breaks it again is recorded as broken.
+    """
+    queue = deque(entries)
+    suspects = []
+    while queue:
+        with _process_pool(workers) as pool:
+            in_flight = {}
+            while queue or in_flight:
+                # Only a few files in flight, so a crash leaves few suspects
+                while queue and len(in_flight) < workers * 2:
+                    entry = queue.popleft()
+                    in_flight[pool.submit(extract_metadata, entry)] = entry
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    entry = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        suspects.append(entry)
+                        broken = True
+                if broken:
+                    suspects.extend(in_flight.values())
+                    break
+    pool = None
+    try:
+        for entry in suspects:
+            if pool is None:
+                pool = _process_pool(1)
+            try:
+                result = pool.submit(extract_metadata, entry).result()
+            except BrokenProcessPool:
+                pool.shutdown()
+                pool = None
+                result = _broken(entry, "Crashed the metadata extractor")
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def scan(index, roots, workers: int = None, progress=None):
+    """Bring index up to date with the documents under roots.
+
+    Only files that are new or whose size or mtime changed are opened, in a
+    pool of worker processes. Documents that disappeared are dropped, but
+    only from directories that could be listed: anything under a missing root
+    or an unreadable directory keeps its entry and reading position.
+    progress(done, total) is called as changed files are extracted.
+    Returns (files found, files extracted, files removed).
+    """
+    files, unreadable = walk(roots)
+    known = index.stats(roots)
+    changed = [entry for entry in files if known.get(entry[0]) != (entry[1], entry[2])]
+    unreadable = set(unreadable)
+    under_unreadable = tuple(os.path.join(path, '') for path in unreadable)
+    removed = {path for path in set(known).difference(path for path, _, _ in files)
+               if path not in unreadable and not path.startswith(under_unreadable)}
+    if removed:
+        index.remove(removed)
+    if changed:
+        workers = workers or max(1, min(len(changed) // BATCH_SIZE + 1, (os.cpu_count() or 2) - 1))
+        batch = []
+        for done, result in enumerate(_extract_all(changed, workers), 1):
+            batch.append(result)
+            if len(batch) >= BATCH_SIZE:
+                index.update(batch)
+                batch = []
+            if progress is not None:
+                progress(done, len(changed))
+        if batch:
+            index.update(batch)
+    return len(files), len(changed), len(removed)
@@ -0,0 +1,125 @@
+import threading
+
+from PySide6.QtWidgets import QLabel, QLineEdit, QListView, QVBoxLayout, QWidget
+from PySide6.QtCore import (
+    QAbstractListModel, QModelIndex, QSize, QSortFilterProxyModel, Qt, Signal,
+)
+from PySide6.QtGui import QPixmap
+
+from viewer.library_scan import THUMBNAIL_HEIGHT, scan
+
+class LibraryModel(QAbstractListModel):
+    """Documents of a LibraryIndex; covers are loaded as they are shown."""
+
+    def __init__(self, library, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.documents = []
+        self._covers = {}
+
+    def reload(self, roots):
+        self.beginResetModel()
+        self.documents = self.library.documents(roots)
+        self._covers = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.documents)
+
+    def data(self, model_index, role=Qt.DisplayRole):
+        document = self.documents[model_index.row()]
+        if role == Qt.DisplayRole:
+            text = document.title
+            if document.authors:
+                text += f"\n{document.authors}"
+            if document.progress:
+                text += f"\n{round(document.progress * 100)}% read"
+            return text
+        if role == Qt.DecorationRole:
+            pixmap = self._covers.get(document.path)
+            if pixmap is None:
+                pixmap = QPixmap()
+                data = self.library.cover(document.path)
+                if data:
+                    pixmap.loadFromData(data)
+                self._covers[document.path] = pixmap
+            return pixmap if not pixmap.isNull() else None
+        if role == Qt.ToolTipRole:
+            return document.error or document.path
+        if role == Qt.UserRole:
+            return document.path
+        return None
+
+class LibraryView(QWidget):
+    """Covers of every document under some directories, with a filter field.
+
+    What is already in the index shows up at once; the directories are then
+    rescanned in the background and the list refreshed once that is done.
+    """
+
+    document_chosen = Signal(str)
+    _scan_finished = Signal(object)
+
+    def __init__(self, library, roots, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.roots = roots
+        self.model = LibraryModel(library, self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        self.filter = QLineEdit(self)
+        self.filter.setPlaceholderText("Filter by title or author")
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+        self.status = QLabel(self)
+        self.list = QListView(self)
+        self.list.setViewMode(QListView.IconMode)
+        self.list.setResizeMode(QListView.Adjust)
+        self.list.setMovement(QListView.Static)
+        self.list.setUniformItemSizes(True)
+        self.list.setWordWrap(True)
+        self.list.setIconSize(QSize(THUMBNAIL_HEIGHT * 3 // 4, THUMBNAIL_HEIGHT))
+        self.list.setGridSize(QSize(THUMBNAIL_HEIGHT, THUMBNAIL_HEIGHT + 70))
+        self.list.setModel(self.proxy)
+        self.list.activated.connect(self._on_activated)
+        layout.addWidget(self.filter)
+        layout.addWidget(self.list)
+        layout.addWidget(self.status)
+
+        self._scan_finished.connect(self._on_scan_finished)
+        self.model.reload(self.roots)
+        self.rescan()
+
+    def rescan(self):
+        """Scan the directories again on a background thread."""
+        self.status.setText("Scanning...")
+        threading.Thread(target=self._scan, name='library-scan', daemon=True).start()
+
+    def _scan(self):
+        try:
+            result = scan(self.library, self.roots)
+        except Exception as e:
+            result = e
+        self._scan_finished.emit(result)
+
+    def _on_scan_finished(self, result):
+        if isinstance(result, Exception):
+            self.status.setText(f"Scan failed: {result}")
+            return
+        found, extracted, removed = result
+        self.status.setText(f"{found} documents, {extracted} updated, {removed} removed")
+        if extracted or removed:
+            self.model.reload(self.roots)
+
+    def refresh(self):
+        """Show reading progress saved since the list was loaded."""
+        self.model.reload(self.roots)
+
+    def _on_activated(self, model_index):
+        self.document_chosen.emit(model_index.data(Qt.UserRole))
+
+    def sizeHint(self):
+        return QSize(900, 700)
@@ -0,0 +1,57 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRectF, QSize, Signal
+from PySide6.QtGui import QColor, QPainter
+
+from utils.instrumentation import recorder
+
+# Translucent yellow drawn over search matches
+HIGHLIGHT_COLOR = QColor(255, 220, 0, 110)
+
+class PageCanvas(QWidget):
+    """Paints one page from a low-resolution preview and full-resolution tiles.
+
+    The preview is stretched over the whole canvas so something is on screen
+    immediately; tile_source(rect) yields (target rect, pixmap) pairs for the
+    tiles that are already rendered and they are drawn on top of it.
+    """
+
+    painted = Signal()
+
+    def __init__(self, tile_source, parent=None):
+        super().__init__(parent)
+        self.preview = None
+        self.tile_source = tile_source
+        self.highlights = []  # QPolygonF search matches, in canvas pixels
+
+    def set_page(self, preview, size: QSize):
+        """Show a new preview at the given display size."""
+        self.preview = preview
+        if size != self.size():
+            self.resize(size)
+        self.update()
+
+    def sizeHint(self):
+        return self.size()
+
+    def paintEvent(self, event):
+        with recorder.span('page paint'):
+            self._paint(event)
+        self.painted.emit()
+
+    def _paint(self, event):
+        painter = QPainter(self)
+        rect = event.rect()
+        if self.preview is not None and self.width() and self.height():
+            # Only scale the part of the preview that is being repainted
+            sx = self.preview.width() / self.width()
+            sy = self.preview.height() / self.height()
+            source = QRectF(rect.x() * sx, rect.y() * sy, rect.width() * sx, rect.height() * sy)
+            painter.drawPixmap(QRectF(rect), self.preview, source)
+        for target, pixmap in self.tile_source(rect):
+            painter.drawPixmap(target.topLeft(), pixmap)
+        if self.highlights:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(HIGHLIGHT_COLOR)
+            for polygon in self.highlights:
+                painter.drawPolygon(polygon)
+        painter.end()
@@ -1,62 +1,377 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QScrollArea
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QImage, QPixmap, QPainter
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QScrollArea
+from PySide6.QtCore import Qt, QPointF, QRect, QSize, QTimer, Signal
+from PySide6.QtGui import QImage, QPixmap, QPainter, QPolygonF
 import fitz  # PyMuPDF
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from utils.disk_cache import RasterCache, document_hash
+from utils.instrumentation import recorder
+
+from viewer.continuous_view import ContinuousView
+from viewer.page_canvas import PageCanvas
+from viewer.process_renderer import RenderPool, attach_image, create_renderer
+from viewer.render_cache import (
+    TILE_SIZE, PixmapCache, RenderKey, RenderScheduler, fitz_lock, render_page,
+)
+from viewer.search import SearchIndexer
+
+# Whole pages are rendered to this height in pixels, whatever their size
+PAGE_HEIGHT = 1080
+
+# Pages restored from disk are re-rendered behind any prefetching
+VERIFY_PRIORITY = 1000
+
+# Pages waiting to be written to disk; when writing falls behind, further
+# pages are not cached on disk rather than held in memory
+MAX_PENDING_WRITES = 8
+
+def fit_key(index: int, rect) -> RenderKey:
+    """Cache key for a whole page at fit-to-height scale."""
+    return RenderKey(index, PAGE_HEIGHT / rect.height, 1.0)
+
+def prewarm(file_paths, pages: int = 20, disk_cache: RasterCache = None, workers: int = None):
+    """Render the first pages of each PDF into the disk cache.
+
+    Pages of all documents are spread over a pool of worker processes.
+    Yields (path, error) once a document is done, error being None on success.
+    """
+    disk_cache = disk_cache or RasterCache()
+    pool = RenderPool(workers)
+    # Bound the pages in flight so finished blocks do not pile up in shared memory
+    in_flight = deque()
+    limit = pool.workers * 4
+    failed = {}
+
+    def finish_oldest():
+        path, doc_hash, key, future, last = in_flight.popleft()
+        try:
+            disk_cache.put(doc_hash, key, attach_image(future.result()))
+        except Exception as e:
+            failed.setdefault(path, e)
+        if last:
+            return path, failed.pop(path, None)
+        return None
+
+    try:
+        for path in file_paths:
+            try:
+                doc_hash = document_hash(path)
+                with fitz.open(path) as document:
+                    keys = [fit_key(i, document[i].rect) for i in range(min(pages, len(document)))]
+            except Exception as e:
+                yield path, e
+                continue
+            keys = [key for key in keys if not disk_cache.has(doc_hash, key)]
+            if not keys:
+                yield path, None
+                continue
+            for key in keys:
+                in_flight.append((path, doc_hash, key, pool.submit(path, key), key is keys[-1]))
+                while len(in_flight) > limit:
+                    done = finish_oldest()
+                    if done:
+                        yield done
+        while in_flight:
+            done = finish_oldest()
+            if done:
+                yield done
+    finally:
+        pool.shutdown()
+
+def pdf_text_source(file_path: str):
+    """Text source for SearchIndexer reading pages from a private handle."""
+    def open_source():
+        document = fitz.open(file_path)
+
+        def extract(page: int) -> str:
+            with fitz_lock:
+                return document[page].get_text()
+
+        return len(document), extract, document.close
+    return open_source
+
 class PDFViewer(QWidget):
-    def __init__(self, file_path: str):
+    first_frame = Signal()  # Emitted once the first page has been painted
+    _hash_ready = Signal(str)
+
+    min_zoom = 0.25
+    max_zoom = 8.0
+
+    def __init__(self, file_path: str, position: float = None):
         super().__init__()
         self.current_page = 0
         self.document = None
-        self.a4_height = 1080
+        self.zoom_factor = 1.0
+        self.a4_height = PAGE_HEIGHT
         self.a4_width = int(self.a4_height / 1.414)
+        self._page_rects = {}
+
+        # Search matches of the current query, as quads per page
+        self._search_query = None
+        self._search_quads = {}
+
+        # Continuous scrolling view, created the first time it is switched on
+        self.continuous_mode = False
+        self.continuous = None
+
+        # Ready pixmaps for pages around the current one
+        self.prefetch_radius = 2
+        self.cache = PixmapCache(max_bytes=256 * 1024 * 1024)
+
+        # Whole pages are also kept on disk, keyed by the document's content hash
+        self.disk_cache = RasterCache()
+        self._unverified = set()
+        # Pages are compressed on their way to disk, which is kept off the GUI thread
+        self._disk_writer = ThreadPoolExecutor(max_workers=1)
+        self._pending_writes = set()
         
         # Load document
         self.load_document(file_path)
+
+        # A document seen before has its hash remembered; hashing a new one
+        # takes a moment, so that is done off the GUI thread
+        self.doc_hash = document_hash(file_path, compute=False)
+        if self.doc_hash is None:
+            self._hash_ready.connect(self._on_hash_ready)
+            threading.Thread(target=self._hash_document, args=(file_path,), daemon=True).start()
+
+        # Background renderer with its own document handles
+        self.scheduler = RenderScheduler(create_renderer(file_path), self)
+        self.scheduler.page_ready.connect(self._on_page_ready)
         
         # Set up layout
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(self.layout)
 
-        # Set up scroll area and label
+        # Set up scroll area and page canvas
         self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.image_label = QLabel(self)
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.scroll_area.setWidget(self.image_label)
+        self.scroll_area.setAlignment(Qt.AlignCenter)
+        self.canvas = PageCanvas(self.cached_tiles)
+        self.scroll_area.setWidget(self.canvas)
+        self.canvas.painted.connect(self._on_first_paint)
         self.layout.addWidget(self.scroll_area)
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(self.update_tiles)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.update_tiles)
 
         # Set initial window size to A4 at 1080px height
         self.resize(self.a4_width, self.a4_height)
 
-        # Initial render
+        # Initial render, of the page reading stopped at last time if known
+        if position:
+            self.current_page = min(max(int(position), 0), len(self.document) - 1)
         self.render_current_page()
 
+        # Index text for search once the first pages are up
+        self.indexer = SearchIndexer(file_path, pdf_text_source(file_path), self)
+        QTimer.singleShot(1000, self.indexer.start)
+
     def load_document(self, file_path: str):
         """Load PDF document using PyMuPDF."""
         self.document = fitz.open(file_path)
         if not self.document:
             raise RuntimeError(f"Failed to load PDF: {file_path}")
+
+    def page_rect(self, index: int):
+        """Page size in points, remembered so pages are only loaded once."""
+        rect = self._page_rects.get(index)
+        if rect is None:
+            rect = self._page_rects[index] = self.document[index].rect
+        return rect
+
+    def page_key(self, index: int) -> RenderKey:
+        """Cache key for a whole page at fit-to-height scale."""
+        return fit_key(index, self.page_rect(index))
+
+    def _hash_document(self, file_path: str):
+        try:
+            self._hash_ready.emit(document_hash(file_path))
+        except OSError:
+            pass  # Without a hash the disk cache is simply not used
+
+    def _on_hash_ready(self, doc_hash: str):
+        self.doc_hash = doc_hash
+        # Whole pages rendered before the hash was known are worth keeping too
+        for key in self.cache.keys():
+            if key.tile is None and key.zoom == 1.0:
+                image = self.cache.get(key).toImage().convertToFormat(QImage.Format_RGB888)
+                self._store_on_disk(key, image)
+
+    def _store_on_disk(self, key: RenderKey, image: QImage):
+        """Write a whole page to the disk cache in the background."""
+        if len(self._pending_writes) >= MAX_PENDING_WRITES:
+            return
+        future = self._disk_writer.submit(self._write_to_disk, self.doc_hash, key, image)
+        self._pending_writes.add(future)
+        future.add_done_callback(self._pending_writes.discard)
+
+    def _write_to_disk(self, doc_hash: str, key: RenderKey, image: QImage):
+        with recorder.span('disk cache write'):
+            self.disk_cache.put(doc_hash, key, image)
+
+    def _load_from_disk(self, key: RenderKey):
+        """Pixmap for a whole page from the disk cache, queued for verification."""
+        if self.doc_hash is None:
+            return None
+        with recorder.span('disk cache read'):
+            image = self.disk_cache.get(self.doc_hash, key)
+        recorder.count('disk cache', image is not None)
+        if image is None:
+            return None
+        # Show it now, but re-render in the background in case it is stale
+        self._unverified.add(key)
+        self.scheduler.request(key, VERIFY_PRIORITY + abs(key.page - self.current_page))
+        with recorder.span('QPixmap convert'):
+            pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        return pixmap
+
+    def page_size(self, index: int, zoom: float = None) -> QSize:
+        """Display size of a page, at the current zoom unless one is given."""
+        rect = self.page_rect(index)
+        zoom = self.page_key(index).scale * (self.zoom_factor if zoom is None else zoom)
+        return QSize(round(rect.width * zoom), round(rect.height * zoom))
     
     def render_current_page(self):
         if not self.document:
             return
-        page = self.document[self.current_page]
-        if not page:
+        with recorder.span('pdf render_current_page'):
+            self._render_current_page()
+        recorder.sample(pixmap_bytes=self.cache.current_bytes, pixmaps=len(self.cache))
+
+    def _render_current_page(self):
+        if self.continuous_mode:
+            self.continuous.viewport().update()
+            self.prefetch()
             return
-        # Render so that height is always 1080px, width is A4 aspect
-        scale = self.a4_height / page.rect.height
-        matrix = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
-        img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-        self.image_label.setPixmap(QPixmap.fromImage(img))
-        self.image_label.resize(img.width(), img.height())
+        key = self.page_key(self.current_page)
+        pixmap = self.cache.get(key)
+        recorder.count('pixmap cache', pixmap is not None)
+        if pixmap is None:
+            pixmap = self._load_from_disk(key)
+        if pixmap is None:
+            # Cache miss: render this page right away, neighbours go to the scheduler
+            image = render_page(self.document, key)
+            with recorder.span('QPixmap convert'):
+                pixmap = QPixmap.fromImage(image)
+            self.cache.put(key, pixmap)
+            if self.doc_hash is not None:
+                self._store_on_disk(key, image)
+        # At other zoom levels the whole page only serves as a preview for tiles
+        size = self.page_size(self.current_page)
+        self.canvas.highlights = self.highlight_polygons(self.current_page, QRect(0, 0, size.width(), size.height()))
+        self.canvas.set_page(pixmap, size)
+        self.prefetch()
+        self.update_tiles()
+
+    def prefetch(self):
+        """Queue the pages around the ones on screen, nearest first."""
+        if self.continuous_mode:
+            shown = self.continuous.visible_pages()
+        else:
+            shown = range(self.current_page, self.current_page + 1)
+        first = max(0, shown.start - self.prefetch_radius)
+        last = min(len(self.document) - 1, shown.stop - 1 + self.prefetch_radius)
+        wanted = {self.page_key(i) for i in range(first, last + 1)}
+        # Drop requests left over from pages the reader has moved away from
+        self.scheduler.retain(
+            lambda key: key in wanted or key.tile is not None or key in self._unverified)
+        for key in wanted:
+            if key not in self.cache and self._load_from_disk(key) is None:
+                distance = key.page - self.current_page
+                # Prefer the reading direction: next pages before previous ones
+                priority = 2 * abs(distance) - (distance > 0)
+                self.scheduler.request(key, priority)
+
+    def _tile_keys(self, rect: QRect):
+        """Keys of the current page's tiles that intersect rect, in canvas pixels."""
+        rect = rect.intersected(self.canvas.rect())
+        if rect.isEmpty():
+            return []
+        base = self.page_key(self.current_page)._replace(zoom=self.zoom_factor)
+        return [
+            base._replace(tile=(col, row))
+            for row in range(rect.top() // TILE_SIZE, rect.bottom() // TILE_SIZE + 1)
+            for col in range(rect.left() // TILE_SIZE, rect.right() // TILE_SIZE + 1)
+        ]
+
+    def visible_rect(self) -> QRect:
+        """Part of the canvas currently shown in the scroll area."""
+        viewport = self.scroll_area.viewport()
+        return QRect(self.canvas.mapFrom(viewport, viewport.rect().topLeft()), viewport.size())
+
+    def update_tiles(self):
+        """Request the zoomed tiles covering the viewport, centre outwards."""
+        if self.continuous_mode:
+            return
+        if self.zoom_factor == 1.0:
+            self.scheduler.retain(lambda key: key.tile is None)
+            return
+        visible = self.visible_rect()
+        center = visible.center()
+
+        def distance(key):
+            col, row = key.tile
+            dx = (col + 0.5) * TILE_SIZE - center.x()
+            dy = (row + 0.5) * TILE_SIZE - center.y()
+            return dx * dx + dy * dy
+
+        tiles = sorted(self._tile_keys(visible), key=distance)
+        wanted = set(tiles)
+        # Tiles that scrolled out of view or belong to another zoom are stale
+        self.scheduler.retain(lambda key: key.tile is None or key in wanted)
+        for rank, key in enumerate(tiles):
+            if key not in self.cache:
+                # Visible tiles go ahead of any page prefetching
+                self.scheduler.request(key, rank - len(tiles))
+
+    def cached_tiles(self, rect: QRect):
+        """Rendered tiles intersecting rect, as (target rect, pixmap) pairs."""
+        if self.zoom_factor == 1.0:
+            return
+        for key in self._tile_keys(rect):
+            pixmap = self.cache.get(key)
+            if pixmap is not None:
+                col, row = key.tile
+                yield QRect(col * TILE_SIZE, row * TILE_SIZE, pixmap.width(), pixmap.height()), pixmap
+
+    def _on_first_paint(self):
+        self.canvas.painted.disconnect(self._on_first_paint)
+        self.first_frame.emit()
+
+    def _on_page_ready(self, key: RenderKey, image: QImage):
+        """Store a page or tile finished by the scheduler."""
+        if key.tile is not None and key.zoom != self.zoom_factor:
+            return
+        stale = False
+        if key.tile is None and self.doc_hash is not None:
+            if key in self._unverified:
+                self._unverified.discard(key)
+                if self.disk_cache.get(self.doc_hash, key) == image:
+                    return
+                # The disk copy was out of date: replace it everywhere
+                stale = True
+            self._store_on_disk(key, image)
+        with recorder.span('QPixmap convert'):
+            pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        if self.continuous_mode:
+            if key.tile is None and key.page in self.continuous.visible_pages():
+                self.continuous.viewport().update()
+            return
+        if stale and key.page == self.current_page:
+            self.canvas.set_page(pixmap, self.canvas.size())
+        if key.tile is not None and key.page == self.current_page:
+            col, row = key.tile
+            self.canvas.update(QRect(col * TILE_SIZE, row * TILE_SIZE, image.width(), image.height()))
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        # No need to re-render on resize
+        # Pages are not re-rendered on resize, but more tiles may now be visible
+        self.update_tiles()
 
     def paintEvent(self, event):
         pass  # No custom painting needed
@@ -66,30 +381,154 @@ class PDFViewer(QWidget):
 
     def minimumSizeHint(self):
         return QSize(400, 300)
+
+    def toggle_continuous(self):
+        """Switch between single pages and one continuous vertical strip."""
+        if self.continuous is None:
+            # Every page's size is needed up front to lay out the strip
+            sizes = [self.page_size(i, 1.0) for i in range(len(self.document))]
+            self.continuous = ContinuousView(sizes, self.continuous_pixmap, self.highlight_polygons, self)
+            self.continuous.page_changed.connect(self._on_continuous_page_changed)
+            self.layout.addWidget(self.continuous)
+        self.continuous_mode = not self.continuous_mode
+        if self.continuous_mode:
+            self.scheduler.retain(lambda key: key.tile is None)
+            self.scroll_area.hide()
+            self.continuous.show()
+            self.continuous.set_zoom(self.zoom_factor)
+            self.continuous.scroll_to_page(self.current_page, animate=False)
+            self.continuous.setFocus()
+        else:
+            self.continuous.hide()
+            self.scroll_area.show()
+        self.render_current_page()
+
+    def continuous_pixmap(self, index: int):
+        """Pixmap for a page shown in the continuous view, or None while it renders."""
+        key = self.page_key(index)
+        pixmap = self.cache.get(key) or self._load_from_disk(key)
+        if pixmap is None:
+            self.scheduler.request(key, 0)
+        return pixmap
+
+    def _on_continuous_page_changed(self, index: int):
+        self.current_page = index
+        self.prefetch()
+
+    def go_to_page(self, page_num: int):
+        """Jump to the specified page."""
+        if self.continuous_mode:
+            self.continuous.scroll_to_page(page_num, animate=False)
+        elif 0 <= page_num < len(self.document) and page_num != self.current_page:
+            self.current_page = page_num
+            self.render_current_page()
+
+    def go_to_fraction(self, fraction: float):
+        """Jump to a position given as a fraction of the document."""
+        if self.continuous_mode:
+            self.continuous.scroll_to_fraction(fraction)
+        else:
+            self.go_to_page(round(min(max(fraction, 0.0), 1.0) * (len(self.document) - 1)))
     
+    def position(self) -> float:
+        """Where reading is, for go_to_position."""
+        return float(self.current_page)
+
+    def go_to_position(self, position: float):
+        self.go_to_page(min(max(int(position), 0), len(self.document) - 1))
+
+    def fraction(self) -> float:
+        """Position of the current page as a fraction of the document."""
+        return self.current_page / max(len(self.document) - 1, 1)
+
     def next_page(self):
         """Go to next page."""
-        if self.current_page < len(self.document) - 1:
+        if self.continuous_mode:
+            self.continuous.next_page()
+        elif self.current_page < len(self.document) - 1:
             self.current_page += 1
             self.render_current_page()
     
     def previous_page(self):
         """Go to previous page."""
-        if self.current_page > 0:
+        if self.continuous_mode:
+            self.continuous.previous_page()
+        elif self.current_page > 0:
             self.current_page -= 1
             self.render_current_page()
+
+    def set_zoom(self, zoom: float):
+        """Change the zoom level, keeping the centre of the view in place."""
+        zoom = min(max(round(zoom, 3), self.min_zoom), self.max_zoom)
+        if zoom == self.zoom_factor:
+            return
+        if self.continuous_mode:
+            self.zoom_factor = zoom
+            self.continuous.set_zoom(zoom)
+            self.prefetch()
+            return
+        hbar = self.scroll_area.horizontalScrollBar()
+        vbar = self.scroll_area.verticalScrollBar()
+        width = max(1, self.canvas.width())
+        height = max(1, self.canvas.height())
+        fx = (hbar.value() + hbar.pageStep() / 2) / width
+        fy = (vbar.value() + vbar.pageStep() / 2) / height
+        self.zoom_factor = zoom
+        self.render_current_page()
+        hbar.setValue(round(fx * self.canvas.width() - hbar.pageStep() / 2))
+        vbar.setValue(round(fy * self.canvas.height() - vbar.pageStep() / 2))
     
     def zoom_in(self):
         """Increase zoom level."""
-        self.zoom_factor *= 1.2
-        self.render_current_page()
+        self.set_zoom(self.zoom_factor * 1.2)
     
     def zoom_out(self):
         """Decrease zoom level."""
-        self.zoom_factor /= 1.2
-        self.render_current_page()
+        self.set_zoom(self.zoom_factor / 1.2)
     
     def reset_zoom(self):
         """Reset zoom to fit window."""
-        self.zoom_factor = 1.0
-        self.render_current_page() 
\ No newline at end of file
+        self.set_zoom(1.0)
+
+    def search(self, query: str):
+        """Pages matching query among those indexed so far, as (page, hits)."""
+        return self.indexer.index.search(query)
+
+    def show_search_hit(self, page: int, query: str):
+        """Go to a page with matches and highlight them."""
+        if query != self._search_query:
+            self._search_query = query
+            self._search_quads = {}
+        if page == self.current_page and not self.continuous_mode:
+            self.render_current_page()
+        else:
+            self.go_to_page(page)
+
+    def clear_search(self):
+        self._search_query = None
+        self._search_quads = {}
+        self.render_current_page()
+
+    def highlight_polygons(self, index: int, rect: QRect):
+        """Search matches on a page drawn at rect, as polygons."""
+        if not self._search_query:
+            return []
+        quads = self._search_quads.get(index)
+        if quads is None:
+            with fitz_lock:
+                quads = self.document[index].search_for(self._search_query, quads=True)
+            self._search_quads[index] = quads
+        scale = rect.height() / self.page_rect(index).height
+        return [
+            QPolygonF([QPointF(rect.x() + p.x * scale, rect.y() + p.y * scale)
+                       for p in (quad.ul, quad.ur, quad.lr, quad.ll)])
+            for quad in quads
+        ]
+
+    def cleanup(self):
+        """Stop background rendering and indexing."""
+        self.indexer.stop()
+        self.scheduler.shutdown()
+        # Pages still on their way to disk are worth waiting for
+        self._disk_writer.shutdown(wait=True)
+        self.cache.clear()
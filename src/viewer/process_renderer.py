@@ -0,0 +1,151 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+import threading
+import weakref
+
+from PySide6.QtGui import QImage
+
+from utils.concurrency import cancel_pending
+from viewer.render_cache import FitzRenderer
+from viewer.render_worker import RenderKey, render_shared
+
+def default_workers() -> int:
+    """One worker per core but one, which is left to the GUI thread."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def _release(shm):
+    shm.close()
+
+def attach_image(layout) -> QImage:
+    """Wrap a block written by a worker as a QImage without copying the pixels.
+
+    The block is unlinked right away and unmapped once the QImage wrapper is
+    garbage collected, so the image must not be kept beyond that wrapper;
+    QPixmap.fromImage and QImage.copy give independent copies.
+    """
+    name, width, height, stride = layout
+    shm = shared_memory.SharedMemory(name=name)
+    shm.unlink()  # Our mapping stays valid, the name is no longer needed
+    image = QImage(shm.buf, width, height, stride, QImage.Format_RGB888)
+    weakref.finalize(image, _release, shm)
+    return image
+
+class RenderPool:
+    """Worker processes that rasterize pages, each with its own fitz handles.
+
+    PyMuPDF cannot render on several threads at once, so parallel rendering
+    needs separate processes. Workers are started on demand up to the limit.
+    A worker that dies, say MuPDF crashing on a bad file or an OOM kill,
+    breaks the whole executor; it is then replaced by a fresh one.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or default_workers()
+        self._executor = self._new_executor()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Forking a process that runs Qt threads is unsafe, always spawn
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _replace(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Swap a broken executor for a new one, unless another thread already did."""
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._new_executor()
+            return self._executor
+
+    def _submit(self, file_path: str, key: RenderKey):
+        """(executor, future) for rendering key on the current executor."""
+        executor = self._executor
+        try:
+            future = executor.submit(render_shared, file_path, key)
+        except BrokenProcessPool:
+            executor = self._replace(executor)
+            future = executor.submit(render_shared, file_path, key)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return executor, future
+
+    def submit(self, file_path: str, key: RenderKey):
+        """Future resolving to the block layout to pass to attach_image."""
+        return self._submit(file_path, key)[1]
+
+    def _forget(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def render(self, file_path: str, key: RenderKey) -> QImage:
+        executor, future = self._submit(file_path, key)
+        try:
+            layout = future.result()
+        except BrokenProcessPool:
+            # Whatever killed the worker may have been another page; try once
+            # more on a fresh executor, and give up if this key breaks it again
+            self._replace(executor)
+            layout = self.submit(file_path, key).result()
+        return attach_image(layout)
+
+    def shutdown(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        cancel_pending(pending)
+        self._executor.shutdown(wait=False)
+
+# The pool every viewer in the process renders on, started on first use
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def shared_pool() -> RenderPool:
+    """The process-wide RenderPool, sized by READER_RENDER_WORKERS if set.
+
+    Workers are shared by all open documents, each keeping a few documents
+    open, so opening another PDF costs no new processes.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            workers = os.environ.get('READER_RENDER_WORKERS')
+            _shared_pool = RenderPool(int(workers) if workers else None)
+        return _shared_pool
+
+def shutdown_shared_pool():
+    """Stop the shared pool's workers; a later shared_pool() starts a new one."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.shutdown()
+            _shared_pool = None
+
+class ProcessRenderer:
+    """RenderScheduler backend that renders one document on a RenderPool."""
+
+    def __init__(self, file_path: str, pool: RenderPool = None):
+        self.file_path = file_path
+        self.pool = pool or shared_pool()
+        # One scheduler thread per worker keeps every process busy
+        self.concurrency = self.pool.workers
+
+    def render(self, key: RenderKey) -> QImage:
+        return self.pool.render(self.file_path, key)
+
+    def close(self):
+        pass  # The pool outlives any one document
+
+def create_renderer(file_path: str):
+    """Rendering backend for the viewer.
+
+    READER_RENDER_WORKERS sets the number of worker processes; 0 renders on a
+    single background thread inside the GUI process instead.
+    """
+    workers = os.environ.get('READER_RENDER_WORKERS')
+    if workers is not None and int(workers) == 0:
+        return FitzRenderer(file_path)
+    return ProcessRenderer(file_path)
@@ -0,0 +1,210 @@
+import os
+import sys
+from pathlib import Path
+
+from PySide6.QtWidgets import QApplication, QInputDialog, QMainWindow, QMessageBox, QWidget
+from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtGui import QKeyEvent
+
+from utils.profiling import StartupProfiler
+
+class ReaderWindow(QMainWindow):
+    closed = Signal(str)  # Path of the document, once the window is closed
+
+    def __init__(self, file_path: str, profiler: StartupProfiler = None, library=None):
+        super().__init__()
+        # Remove forced full-screen and frameless window
+        self.setWindowTitle("Reader")
+        self.file_path = file_path
+        self.profiler = profiler or StartupProfiler(enabled=False)
+        self.library = library  # LibraryIndex with metadata and reading positions
+        self.viewer = None
+        self.search_bar = None
+        self.debug_overlay = None
+        
+        # Create central widget; the viewer replaces it once the document is open
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+
+    def load_document(self):
+        """Create the viewer; called after the window is already on screen."""
+        document = self._library_document()
+        if document is not None and document.title:
+            self.setWindowTitle(f"{document.title} - Reader")
+        # Initialize viewer based on file type. This runs from the event loop,
+        # where an exception would leave an empty window behind.
+        try:
+            self.viewer = self._create_viewer(self.file_path, document)
+        except Exception as e:
+            self._fail("Cannot Open File", f"Cannot open {self.file_path}: {e}")
+            return
+        if self.viewer:
+            self.profiler.mark('document opened')
+            self.viewer.first_frame.connect(self._on_first_frame)
+            self.setCentralWidget(self.viewer)
+            self.resize(self.viewer.sizeHint())
+        else:
+            self._fail("Unsupported File", f"Cannot open file: {self.file_path}")
+
+    def _fail(self, title: str, message: str):
+        """Report a document that could not be opened and close the window."""
+        if self.profiler.enabled:
+            # A measurement run has nobody to click the message away
+            self.profiler.report()
+            print(message, file=sys.stderr)
+            QApplication.exit(1)
+        else:
+            QMessageBox.critical(self, title, message)
+        self.close()
+    
+    def _library_document(self):
+        """What the library knows about the document, if anything."""
+        try:
+            if self.library is None:
+                from utils.library_index import LibraryIndex
+                self.library = LibraryIndex()
+            document = self.library.get(self.file_path)
+        except Exception:
+            return None  # Without the library we just start at the beginning
+        self.profiler.mark('library lookup')
+        return document
+
+    def _create_viewer(self, file_path: str, document=None):
+        ext = Path(file_path).suffix.lower()
+        position = document.position if document is not None else None
+        if ext == '.pdf':
+            from viewer.pdf_viewer import PDFViewer
+            self.profiler.mark('viewer imported')
+            return PDFViewer(file_path, position)
+        elif ext == '.epub':
+            from viewer.epub_viewer import EpubViewer
+            self.profiler.mark('viewer imported')
+            package = None
+            if document is not None and document.package:
+                stat = os.stat(file_path)
+                # Metadata from a scan of this very version of the file can be reused
+                if (document.size, document.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    package = document.package
+            return EpubViewer(file_path, package, position)
+        return None
+
+    def _on_first_frame(self):
+        self.profiler.mark('first frame')
+        if self.profiler.enabled:
+            # Profiling is a measurement run: report and quit
+            self.profiler.report()
+            QTimer.singleShot(0, self.close)
+    
+    def open_search(self):
+        """Show the search bar, creating it the first time."""
+        if not hasattr(self.viewer, 'search'):
+            return
+        if self.search_bar is None:
+            from viewer.search import SearchBar
+            self.search_bar = SearchBar(self.viewer, self)
+            self._place_search_bar()
+        self.search_bar.open()
+
+    def jump_to_percentage(self):
+        """Ask for a position in the document and go there."""
+        if not hasattr(self.viewer, 'go_to_fraction'):
+            return
+        percent, ok = QInputDialog.getInt(
+            self, "Go To", "Position in the document (%):", round(self.viewer.fraction() * 100), 0, 100)
+        if ok:
+            self.viewer.go_to_fraction(percent / 100)
+
+    def toggle_debug_overlay(self):
+        """Show or hide render timings and memory use over the document."""
+        if self.debug_overlay is None:
+            from viewer.debug_overlay import DebugOverlay
+            self.debug_overlay = DebugOverlay(self)
+        self.debug_overlay.toggle()
+
+    def _place_search_bar(self):
+        if self.search_bar is not None:
+            height = self.search_bar.sizeHint().height()
+            self.search_bar.setGeometry(0, self.height() - height, self.width(), height)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._place_search_bar()
+    
+    def keyPressEvent(self, event: QKeyEvent):
+        if event.key() == Qt.Key_Escape:
+            self.close()
+        elif event.key() == Qt.Key_F and event.modifiers() & Qt.ControlModifier:
+            self.open_search()
+        elif event.key() == Qt.Key_G and event.modifiers() & Qt.ControlModifier:
+            self.jump_to_percentage()
+        elif event.key() == Qt.Key_F12:
+            self.toggle_debug_overlay()
+        elif event.key() == Qt.Key_Space or event.key() == Qt.Key_Right:
+            if self.viewer:
+                self.viewer.next_page()
+        elif event.key() == Qt.Key_Backspace or event.key() == Qt.Key_Left:
+            if self.viewer:
+                self.viewer.previous_page()
+        elif event.key() == Qt.Key_Plus or event.key() == Qt.Key_Equal:
+            if hasattr(self.viewer, 'zoom_in'):
+                self.viewer.zoom_in()
+        elif event.key() == Qt.Key_Minus:
+            if hasattr(self.viewer, 'zoom_out'):
+                self.viewer.zoom_out()
+        elif event.key() == Qt.Key_0:
+            if hasattr(self.viewer, 'reset_zoom'):
+                self.viewer.reset_zoom()
+        elif event.key() == Qt.Key_C:
+            if hasattr(self.viewer, 'toggle_continuous'):
+                self.viewer.toggle_continuous()
+        super().keyPressEvent(event)
+
+    def closeEvent(self, event):
+        if self.viewer and self.library is not None and hasattr(self.viewer, 'position'):
+            try:
+                self.library.save_position(self.file_path, self.viewer.position(), self.viewer.fraction())
+            except Exception:
+                pass  # Losing the position is no reason to fail closing
+        # Give the viewer a chance to stop background work and drop temp files
+        if self.viewer and hasattr(self.viewer, 'cleanup'):
+            self.viewer.cleanup()
+        super().closeEvent(event)
+        self.closed.emit(self.file_path)
+
+class LibraryWindow(QMainWindow):
+    """Every document under some directories; choosing one opens it."""
+
+    def __init__(self, roots):
+        super().__init__()
+        self.setWindowTitle("Library - Reader")
+        from utils.library_index import LibraryIndex
+        from viewer.library_view import LibraryView
+        self.library = LibraryIndex()
+        self.readers = {}
+        self.view = LibraryView(self.library, roots, self)
+        self.view.document_chosen.connect(self.open_document)
+        self.setCentralWidget(self.view)
+        self.resize(self.view.sizeHint())
+
+    def open_document(self, file_path: str):
+        reader = self.readers.get(file_path)
+        if reader is not None:
+            reader.raise_()
+            reader.activateWindow()
+            return
+        reader = ReaderWindow(file_path, library=self.library)
+        reader.closed.connect(self._on_reader_closed)
+        self.readers[file_path] = reader
+        reader.show()
+        QTimer.singleShot(0, reader.load_document)
+
+    def _on_reader_closed(self, file_path: str):
+        reader = self.readers.pop(file_path, None)
+        if reader is not None:
+            reader.deleteLater()
+        self.view.refresh()  # Show the new reading progress
+
+    def keyPressEvent(self, event: QKeyEvent):
+        if event.key() == Qt.Key_Escape:
+            self.close()
+        super().keyPressEvent(event)
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+import threading
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage
+import fitz  # PyMuPDF
+
+from utils.instrumentation import recorder
+from viewer.render_worker import TILE_SIZE, RenderKey, rasterize
+
+# MuPDF is not thread-safe, even across separate documents, so every
+# rasterization in the process is serialized through this lock.
+fitz_lock = threading.Lock()
+
+
+def render_page(document, key: RenderKey) -> QImage:
+    """Render the page described by key into a detached QImage."""
+    with fitz_lock:
+        with recorder.span('fitz rasterize'):
+            pix = rasterize(document, key)
+        with recorder.span('QImage copy'):
+            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+            # The QImage only borrows pix.samples, so take a copy before pix dies
+            return img.copy()
+
+
+def pixmap_bytes(pixmap) -> int:
+    """Approximate memory held by a QPixmap or QImage."""
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class PixmapCache:
+    """LRU cache of ready pixmaps bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def keys(self):
+        """Cached keys, least recently used first."""
+        return list(self._items)
+
+    def get(self, key):
+        """Return the cached pixmap for key and mark it recently used."""
+        pixmap = self._items.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        """Store a pixmap, evicting least recently used entries over budget."""
+        if key in self._items:
+            self.current_bytes -= pixmap_bytes(self._items.pop(key))
+        size = pixmap_bytes(pixmap)
+        if size > self.max_bytes:
+            return
+        self._items[key] = pixmap
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.current_bytes -= pixmap_bytes(evicted)
+
+    def clear(self):
+        self._items.clear()
+        self.current_bytes = 0
+
+
+class FitzRenderer:
+    """Rasterizes pages from a private document handle.
+
+    PyMuPDF documents must not be shared between threads, so the scheduler
+    owns this renderer and only ever calls it from its worker thread.
+    Rendering still takes fitz_lock, which keeps it from overlapping with a
+    synchronous render on the GUI thread.
+    """
+
+    concurrency = 1
+
+    def __init__(self, file_path: str):
+        self.document = fitz.open(file_path)
+
+    def render(self, key: RenderKey) -> QImage:
+        return render_page(self.document, key)
+
+    def close(self):
+        with fitz_lock:
+            self.document.close()
+
+
+class RenderScheduler(QObject):
+    """Renders queued pages off the GUI thread.
+
+    Requests are served lowest priority value first. Finished images are
+    delivered through page_ready on the GUI thread, where they can be turned
+    into pixmaps.
+    """
+
+    page_ready = Signal(object, object)  # RenderKey, QImage
+
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self._pending = {}  # key -> priority
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._running = True
+        self._threads = []
+        for i in range(max(1, getattr(renderer, 'concurrency', 1))):
+            thread = threading.Thread(target=self._run, name=f'render-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def request(self, key, priority: int = 0):
+        """Queue key for rendering unless it is already queued or running."""
+        with self._condition:
+            if key in self._in_flight:
+                return
+            current = self._pending.get(key)
+            if current is None or priority < current:
+                self._pending[key] = priority
+                self._condition.notify()
+
+    def retain(self, predicate):
+        """Cancel pending requests whose key no longer matches predicate."""
+        with self._condition:
+            for key in [k for k in self._pending if not predicate(k)]:
+                del self._pending[key]
+
+    def shutdown(self):
+        """Stop the worker threads and release the renderer."""
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self.renderer.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                key = min(self._pending, key=self._pending.get)
+                del self._pending[key]
+                self._in_flight.add(key)
+            try:
+                image = self.renderer.render(key)
+            except Exception:
+                image = None
+            with self._condition:
+                self._in_flight.discard(key)
+                running = self._running
+            if image is not None and running:
+                self.page_ready.emit(key, image)
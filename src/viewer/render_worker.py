@@ -0,0 +1,56 @@
+from collections import OrderedDict, namedtuple
+from multiprocessing import shared_memory
+
+import fitz  # PyMuPDF
+
+# Render worker processes import this module and nothing else of the viewer,
+# so it must not import Qt: every worker would map the Qt libraries as well.
+
+# A rendered page is identified by its index, the base scale that fits it to
+# the reader height and the user zoom on top of that. Zoomed pages are split
+# into square tiles addressed by (column, row); tile None is the whole page.
+RenderKey = namedtuple('RenderKey', ['page', 'scale', 'zoom', 'tile'], defaults=(None,))
+
+# Edge length of a zoomed tile in device pixels
+TILE_SIZE = 512
+
+# Documents each worker keeps open, most recently used last
+_documents = OrderedDict()
+_MAX_OPEN_DOCUMENTS = 8
+
+def rasterize(document, key: RenderKey):
+    """Render the page or tile described by key into a fitz.Pixmap.
+
+    Callers sharing a process with other renderers must hold fitz_lock.
+    """
+    page = document[key.page]
+    zoom = key.scale * key.zoom
+    clip = None
+    if key.tile is not None:
+        # Only rasterize the part of the page covered by this tile
+        col, row = key.tile
+        step = TILE_SIZE / zoom
+        clip = fitz.Rect(col * step, row * step, (col + 1) * step, (row + 1) * step) & page.rect
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+
+def _worker_document(file_path: str):
+    document = _documents.get(file_path)
+    if document is None:
+        document = _documents[file_path] = fitz.open(file_path)
+        if len(_documents) > _MAX_OPEN_DOCUMENTS:
+            _documents.popitem(last=False)[1].close()
+    else:
+        _documents.move_to_end(file_path)
+    return document
+
+def render_shared(file_path: str, key: RenderKey):
+    """Worker side: render into a new shared memory block and return its layout."""
+    pix = rasterize(_worker_document(file_path), key)
+    size = pix.stride * pix.height
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        shm.buf[:size] = pix.samples_mv
+    finally:
+        # The block lives on until the GUI process unlinks it
+        shm.close()
+    return shm.name, pix.width, pix.height, pix.stride
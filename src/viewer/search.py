@@ -0,0 +1,183 @@
+import os
+import threading
+
+from PySide6.QtWidgets import QFrame, QHBoxLayout, QLabel, QLineEdit
+from PySide6.QtCore import QFileSystemWatcher, QObject, Qt, QTimer, Signal
+
+from utils.search_index import SearchIndex, index_path
+
+class SearchIndexer(QObject):
+    """Keeps the SearchIndex of a document current on a background thread.
+
+    open_source() is called on the worker thread and returns
+    (page_count, extract, close): extract(page) gives the text of one page.
+    A saved index is reused; when the file changed since it was built, every
+    page is extracted again but only pages whose text changed are re-indexed.
+    The file is watched, so edits made while it is open are picked up too.
+    """
+
+    progress = Signal(int, int)  # pages indexed, page count
+
+    # Write partial progress every so many pages so a long run can resume
+    save_every = 200
+
+    def __init__(self, file_path: str, open_source, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.open_source = open_source
+        self.path = index_path(file_path)
+        # The saved index is read on the worker thread; until then searches
+        # simply find nothing
+        self.index = SearchIndex()
+        self._loaded = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._watcher = QFileSystemWatcher([file_path], self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+
+    def _file_source(self):
+        stat = os.stat(self.file_path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def start(self):
+        """Bring the index up to date unless it already is."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='search-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _on_file_changed(self, path: str):
+        self.stop()
+        # Editors often replace the file, which drops it from the watcher
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        # Give whoever is writing the file a moment to finish
+        QTimer.singleShot(500, self.start)
+
+    def _run(self):
+        if not self._loaded:
+            self._loaded = True
+            saved = SearchIndex.load(self.path)
+            if saved is not None:
+                self.index = saved
+        index = self.index
+        try:
+            source = self._file_source()
+        except OSError:
+            return
+        if index.source == source and index.page_count and index.complete:
+            self.progress.emit(index.indexed_pages, index.page_count)
+            return
+        try:
+            page_count, extract, close = self.open_source()
+        except Exception:
+            return
+        try:
+            # Pages indexed from this very file can be skipped when resuming
+            resume = index.source == source
+            index.truncate(page_count)
+            index.source = source
+            for page in range(page_count):
+                if self._stop.is_set():
+                    break
+                if resume and index.digest(page) is not None:
+                    continue
+                try:
+                    index.add_page(page, extract(page))
+                except Exception:
+                    index.add_page(page, '')  # Unreadable pages simply have no text
+                if page % 20 == 0:
+                    self.progress.emit(index.indexed_pages, page_count)
+                if page and page % self.save_every == 0:
+                    index.save(self.path)
+            self.progress.emit(index.indexed_pages, page_count)
+            index.save(self.path)
+        except OSError:
+            pass  # Searching still works from memory
+        finally:
+            close()
+
+class SearchBar(QFrame):
+    """Search field along the bottom of the window.
+
+    Enter or F3 jumps to the next page with a match, Shift+F3 to the previous
+    one and Escape closes the bar. The viewer provides search(query), which
+    returns (location, hits) pairs, show_search_hit(location, query),
+    clear_search() and its SearchIndexer as indexer.
+    """
+
+    def __init__(self, viewer, parent=None):
+        super().__init__(parent)
+        self.viewer = viewer
+        self._location = None
+        self.setAutoFillBackground(True)
+        self.setFrameShape(QFrame.StyledPanel)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(6, 4, 6, 4)
+        self.edit = QLineEdit(self)
+        self.edit.setPlaceholderText("Search")
+        self.status = QLabel(self)
+        layout.addWidget(self.edit)
+        layout.addWidget(self.status)
+        self.edit.returnPressed.connect(self.next_hit)
+        self.edit.textChanged.connect(self._on_text_changed)
+        self.viewer.indexer.progress.connect(self._on_progress)
+        self.hide()
+
+    def open(self):
+        self.show()
+        self.raise_()
+        self.edit.setFocus()
+        self.edit.selectAll()
+
+    def close_bar(self):
+        self.hide()
+        self.viewer.clear_search()
+        self.parentWidget().setFocus()
+
+    def _on_text_changed(self, text: str):
+        self._location = None
+        self.status.clear()
+
+    def _on_progress(self, indexed: int, total: int):
+        if self.isVisible() and indexed < total:
+            self.status.setText(f"Indexing {indexed * 100 // max(total, 1)}%")
+
+    def next_hit(self, step: int = 1):
+        """Show the next (or previous) page with a match for the query."""
+        query = self.edit.text().strip()
+        if not query:
+            return
+        # Searching is cheap, so every step sees pages indexed since the last one
+        hits = self.viewer.search(query)
+        if not hits:
+            self.status.setText("No matches")
+            return
+        locations = [location for location, _ in hits]
+        if self._location is None:
+            position = 0 if step > 0 else len(locations) - 1
+        elif step > 0:
+            position = next((i for i, loc in enumerate(locations) if loc > self._location), 0)
+        else:
+            position = next((i for i in range(len(locations) - 1, -1, -1) if locations[i] < self._location), len(locations) - 1)
+        self._location = locations[position]
+        self.viewer.show_search_hit(self._location, query)
+        status = f"{position + 1} of {len(locations)}"
+        index = self.viewer.indexer.index
+        if not index.complete:
+            status += f" (indexed {index.indexed_pages * 100 // max(index.page_count, 1)}%)"
+        self.status.setText(status)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.close_bar()
+        elif event.key() == Qt.Key_F3:
+            self.next_hit(-1 if event.modifiers() & Qt.ShiftModifier else 1)
+        else:
+            super().keyPressEvent(event)
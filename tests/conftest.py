@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The application imports its modules relative to src/, like main.py does
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
@@ -0,0 +1,42 @@
+import pytest
+
+from run import percentile, regressions
+
+@pytest.mark.parametrize('samples, fraction, expected', [
+    (range(1, 101), 0.99, 99),
+    (range(1, 101), 0.50, 50),
+    (range(1, 101), 1.00, 100),
+    (range(1, 101), 0.07, 7),
+    (range(1, 11), 0.50, 5),
+    (range(1, 11), 0.95, 10),
+    (range(1, 11), 0.0, 1),
+    ([7.0], 0.99, 7.0),
+    ([3, 1, 2], 0.5, 2),
+])
+def test_percentile_is_nearest_rank(samples, fraction, expected):
+    assert percentile(list(samples), fraction) == expected
+
+def results(**metrics):
+    return {'cases': {'pdf-text-200': metrics}}
+
+def test_slowdown_beyond_threshold_is_a_regression():
+    found = regressions(results(first_page_ms=200.0), results(first_page_ms=100.0), 0.25)
+    assert found == [('pdf-text-200', 'first_page_ms', 100.0, 200.0)]
+
+def test_slowdown_within_threshold_passes():
+    assert regressions(results(first_page_ms=120.0), results(first_page_ms=100.0), 0.25) == []
+
+def test_improvements_pass():
+    assert regressions(results(first_page_ms=50.0), results(first_page_ms=100.0), 0.25) == []
+
+def test_changes_below_the_noise_floor_pass():
+    # Triple the time, but only 4 ms more, under the 5 ms floor
+    assert regressions(results(next_page_p50_ms=6.0), results(next_page_p50_ms=2.0), 0.25) == []
+    assert regressions(results(peak_rss_mb=18.0), results(peak_rss_mb=9.0), 0.25) == []
+    assert regressions(results(peak_rss_mb=30.0), results(peak_rss_mb=9.0), 0.25) != []
+
+def test_metrics_missing_from_either_side_are_skipped():
+    baseline = {'cases': {'pdf-text-200': {'zoom_ms': None}}}
+    current = {'cases': {'pdf-text-200': {'zoom_ms': 500.0, 'first_page_ms': 100.0},
+                         'new-case': {'first_page_ms': 1000.0}}}
+    assert regressions(current, baseline, 0.25) == []
@@ -0,0 +1,19 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.concurrency import cancel_pending
+
+def test_cancel_pending_cancels_queued_futures_only():
+    release = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    running = executor.submit(release.wait)
+    queued = [executor.submit(lambda: None) for _ in range(3)]
+    futures = set([running] + queued)
+    for future in queued:
+        future.add_done_callback(futures.discard)  # Shrinks the set mid-iteration
+    cancel_pending(futures)
+    release.set()
+    executor.shutdown(wait=True)
+    assert all(future.cancelled() for future in queued)
+    assert running.result() is True
+    assert futures == {running}
@@ -0,0 +1,101 @@
+import os
+
+from PySide6.QtGui import QImage
+
+from utils.disk_cache import HEADER, MAGIC_RAW, MAGIC_ZLIB, RasterCache, cache_max_bytes
+from viewer.render_cache import RenderKey
+
+def image(width=40, height=30, color=0x336699):
+    img = QImage(width, height, QImage.Format_RGB888)
+    img.fill(color)
+    return img
+
+def disk_bytes(cache):
+    return sum(size for _, _, size in cache._entries())
+
+def test_round_trip(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(3, 1.5, 2.0)
+    assert cache.get('doc', key) is None
+    assert not cache.has('doc', key)
+    cache.put('doc', key, image())
+    assert cache.has('doc', key)
+    restored = cache.get('doc', key)
+    assert restored.size() == image().size()
+    assert restored == image()
+
+def test_documents_are_kept_apart(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(0, 1.0, 1.0)
+    cache.put('one', key, image(color=0xff0000))
+    cache.put('two', key, image(color=0x00ff00))
+    assert cache.get('one', key) == image(color=0xff0000)
+    assert cache.get('two', key) == image(color=0x00ff00)
+
+def test_corrupt_file_reads_as_missing(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(0, 1.0, 1.0)
+    cache.put('doc', key, image())
+    cache._path('doc', key, 'rgb').write_bytes(b'garbage')
+    assert cache.get('doc', key) is None
+
+def test_rewriting_a_page_does_not_grow_the_total(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(0, 1.0, 1.0)
+    for _ in range(5):
+        cache.put('doc', key, image())
+    cache.put('doc', RenderKey(1, 1.0, 1.0), image())
+    assert cache._total_bytes == disk_bytes(cache)
+
+def test_pages_are_stored_compressed(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(0, 1.0, 1.0)
+    cache.put('doc', key, image(400, 600))
+    assert cache._path('doc', key, 'rgb').read_bytes()[:4] == MAGIC_ZLIB
+    assert disk_bytes(cache) < image(400, 600).sizeInBytes() // 10
+    assert cache.get('doc', key) == image(400, 600)
+
+def noise(width=400, height=600):
+    """An image that does not compress, like a photograph."""
+    img = QImage(os.urandom(width * 3 * height), width, height, width * 3, QImage.Format_RGB888)
+    return img.copy()
+
+def test_pages_that_barely_compress_are_stored_raw(tmp_path):
+    cache = RasterCache(tmp_path)
+    key = RenderKey(0, 1.0, 1.0)
+    page = noise()
+    cache.put('doc', key, page)
+    assert cache._path('doc', key, 'rgb').read_bytes()[:4] == MAGIC_RAW
+    assert disk_bytes(cache) == HEADER.size + page.sizeInBytes()
+    assert cache.get('doc', key) == page
+
+def test_cap_comes_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('READER_CACHE_MAX_MB', '64')
+    assert cache_max_bytes() == 64 * 1024 * 1024
+    assert RasterCache(tmp_path).max_bytes == 64 * 1024 * 1024
+    assert RasterCache(tmp_path, max_bytes=1000).max_bytes == 1000
+    monkeypatch.setenv('READER_CACHE_MAX_MB', 'lots')
+    assert cache_max_bytes() == 1024 * 1024 * 1024
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    probe = RasterCache(tmp_path / 'probe')
+    probe.put('doc', RenderKey(0, 1.0, 1.0), image())
+    page_bytes = disk_bytes(probe)
+    cache = RasterCache(tmp_path / 'pages', max_bytes=page_bytes * 3)
+    keys = [RenderKey(i, 1.0, 1.0) for i in range(4)]
+    for age, key in enumerate(keys[:3]):
+        cache.put('doc', key, image())
+        # Distinct mtimes, oldest first, whatever the filesystem's resolution
+        os.utime(cache._path('doc', key, 'rgb'), (1000 + age, 1000 + age))
+    cache.put('doc', keys[3], image())
+    # Eviction goes down to 90% of the cap, so two pages have to make room
+    assert [cache.has('doc', key) for key in keys] == [False, False, True, True]
+    assert cache._total_bytes == disk_bytes(cache) == page_bytes * 2
+    assert cache.evicted == 2
+
+def test_clear(tmp_path):
+    cache = RasterCache(tmp_path / 'pages')
+    cache.put('doc', RenderKey(0, 1.0, 1.0), image())
+    cache.clear()
+    assert disk_bytes(cache) == 0
+    assert cache.get('doc', RenderKey(0, 1.0, 1.0)) is None
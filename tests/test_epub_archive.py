@@ -0,0 +1,108 @@
+import zipfile
+
+import pytest
+
+from viewer.epub_archive import EpubArchive
+
+CONTAINER = """<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>"""
+
+OPF = """<?xml version="1.0"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:title> A Test Book </dc:title>
+    <dc:creator>First Author</dc:creator>
+    <dc:creator>Second Author</dc:creator>
+  </metadata>
+  <manifest>
+    <item id="one" href="text/chapter%201.xhtml" media-type="application/xhtml+xml"/>
+    <item id="two" href="text/chapter2.xhtml" media-type="application/xhtml+xml"/>
+    <item id="cover" href="images/cover.png" media-type="image/png" properties="cover-image"/>
+  </manifest>
+  <spine>
+    <itemref idref="two"/>
+    <itemref idref="one"/>
+    <itemref idref="missing"/>
+  </spine>
+</package>"""
+
+def chapter(number: int) -> bytes:
+    return f"<html><body><p>Chapter {number}</p></body></html>".encode('utf-8')
+
+@pytest.fixture
+def epub(tmp_path):
+    path = tmp_path / 'book.epub'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('mimetype', 'application/epub+zip')
+        z.writestr('META-INF/container.xml', CONTAINER)
+        z.writestr('OEBPS/content.opf', OPF)
+        z.writestr('OEBPS/text/chapter 1.xhtml', chapter(1))
+        z.writestr('OEBPS/text/chapter2.xhtml', chapter(2))
+        z.writestr('OEBPS/images/cover.png', b'\x89PNG fake')
+        z.writestr('OEBPS/style.css', 'p {}')
+    return str(path)
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_package_metadata(epub, use_mmap):
+    archive = EpubArchive(epub, use_mmap=use_mmap)
+    try:
+        assert archive.title == 'A Test Book'
+        assert archive.authors == ['First Author', 'Second Author']
+        # Spine order, with hrefs resolved against the OPF and unquoted
+        assert archive.spine == ['OEBPS/text/chapter2.xhtml', 'OEBPS/text/chapter 1.xhtml']
+        assert archive.cover == 'OEBPS/images/cover.png'
+        assert archive.read(archive.spine[1]) == chapter(1)
+    finally:
+        archive.close()
+
+def test_media_types(epub):
+    archive = EpubArchive(epub)
+    try:
+        assert archive.media_type('OEBPS/images/cover.png') == 'image/png'
+        assert archive.media_type('OEBPS/style.css') == 'text/css'
+        assert archive.media_type('OEBPS/unknown.blob') == 'application/octet-stream'
+    finally:
+        archive.close()
+
+def test_missing_member_raises_key_error(epub):
+    archive = EpubArchive(epub)
+    try:
+        with pytest.raises(KeyError):
+            archive.read('OEBPS/nope.xhtml')
+    finally:
+        archive.close()
+
+def test_cache_is_bounded_by_bytes(epub):
+    size = len(chapter(1))
+    archive = EpubArchive(epub, cache_bytes=size * 2)
+    try:
+        archive.read('OEBPS/text/chapter 1.xhtml')
+        archive.read('OEBPS/text/chapter2.xhtml')
+        archive.read('OEBPS/text/chapter 1.xhtml')  # Now the most recently used
+        archive.read('OEBPS/style.css')
+        assert list(archive._cache) == ['OEBPS/text/chapter 1.xhtml', 'OEBPS/style.css']
+        assert archive._cached_bytes <= size * 2
+    finally:
+        archive.close()
+
+def test_package_from_an_earlier_open_skips_the_opf(epub, tmp_path):
+    first = EpubArchive(epub)
+    package = first.package
+    first.close()
+    archive = EpubArchive(epub, package=package)
+    try:
+        assert archive.package == package
+        assert archive.read(archive.spine[0]) == chapter(2)
+    finally:
+        archive.close()
+
+def test_broken_book_raises_and_closes(tmp_path):
+    path = tmp_path / 'broken.epub'
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('mimetype', 'application/epub+zip')
+    with pytest.raises(KeyError):
+        EpubArchive(str(path))
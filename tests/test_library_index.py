@@ -0,0 +1,103 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from utils.library_index import LibraryIndex
+from viewer import library_scan
+
+def entry(path, title='Title', size=100, mtime_ns=1, **fields):
+    return dict({'path': os.path.abspath(path), 'size': size, 'mtime_ns': mtime_ns, 'kind': 'pdf',
+                 'title': title, 'authors': ['An Author']}, **fields)
+
+@pytest.fixture
+def library(tmp_path):
+    index = LibraryIndex(tmp_path / 'library.sqlite3')
+    yield index
+    index.close()
+
+def test_update_and_get(library, tmp_path):
+    path = str(tmp_path / 'books' / 'a.epub')
+    package = {'spine': ['ch1.xhtml'], 'title': 'A'}
+    library.update([entry(path, kind='epub', pages=3, cover=b'png', package=package)])
+    document = library.get(path)
+    assert document.title == 'Title'
+    assert document.authors == 'An Author'
+    assert document.package == package
+    assert library.cover(path) == b'png'
+    assert library.get(str(tmp_path / 'other.pdf')) is None
+
+def test_documents_are_filtered_by_root_and_sorted_by_title(library, tmp_path):
+    library.update([
+        entry(tmp_path / 'books' / 'b.pdf', title='beta'),
+        entry(tmp_path / 'books' / 'a.pdf', title='Alpha'),
+        entry(tmp_path / 'books2' / 'c.pdf', title='Gamma'),
+    ])
+    titles = [d.title for d in library.documents([str(tmp_path / 'books')])]
+    # books2 shares a prefix with books but is not under it
+    assert titles == ['Alpha', 'beta']
+    assert [d.cover for d in library.documents()] == [None, None, None]
+
+def test_positions_survive_metadata_updates(library, tmp_path):
+    path = str(tmp_path / 'a.pdf')
+    library.save_position(path, 7.0, 0.5)
+    # Opened outside the library: a position but no metadata yet
+    assert library.documents() == []
+    assert library.stats([str(tmp_path)]) == {}
+    library.update([entry(path, size=5, mtime_ns=9)])
+    document = library.get(path)
+    assert (document.position, document.progress) == (7.0, 0.5)
+    assert library.stats([str(tmp_path)]) == {os.path.abspath(path): (5, 9)}
+
+def test_remove(library, tmp_path):
+    path = os.path.abspath(tmp_path / 'a.pdf')
+    library.update([entry(path)])
+    library.remove([path])
+    assert library.get(path) is None
+
+def make_pdf(path):
+    document = fitz.open()
+    document.new_page()
+    document.save(str(path))
+    document.close()
+
+def test_scan_picks_up_new_changed_and_removed_files(library, tmp_path):
+    root = tmp_path / 'books'
+    (root / 'sub').mkdir(parents=True)
+    for name in ('a.pdf', 'sub/b.pdf'):
+        make_pdf(root / name)
+    (root / 'notes.txt').write_text('not a document')
+    assert library_scan.scan(library, [str(root)], workers=1) == (2, 2, 0)
+    assert library_scan.scan(library, [str(root)], workers=1) == (2, 0, 0)
+    (root / 'sub' / 'b.pdf').unlink()
+    assert library_scan.scan(library, [str(root)], workers=1) == (1, 0, 1)
+
+def test_scan_keeps_documents_under_a_missing_root(library, tmp_path):
+    root = tmp_path / 'share'
+    root.mkdir()
+    make_pdf(root / 'a.pdf')
+    library_scan.scan(library, [str(root)], workers=1)
+    library.save_position(str(root / 'a.pdf'), 7.0, 0.5)
+    # The share goes offline
+    root.rename(tmp_path / 'offline')
+    assert library_scan.scan(library, [str(root)], workers=1) == (0, 0, 0)
+    (tmp_path / 'offline').rename(root)
+    assert library.get(str(root / 'a.pdf')).position == 7.0
+
+def crash_on_bad(entry):
+    """Stands in for MuPDF taking the worker process down on a malformed file."""
+    if entry[0].endswith('bad.pdf'):
+        os._exit(1)
+    return library_scan.extract_metadata(entry)
+
+def test_scan_survives_a_crashing_worker(library, tmp_path, monkeypatch):
+    root = tmp_path / 'books'
+    root.mkdir()
+    for name in ('a.pdf', 'bad.pdf', 'c.pdf', 'd.pdf'):
+        make_pdf(root / name)
+    monkeypatch.setattr(library_scan, 'extract_metadata', crash_on_bad)
+    assert library_scan.scan(library, [str(root)], workers=2) == (4, 4, 0)
+    assert library.get(str(root / 'bad.pdf')).error == "Crashed the metadata extractor"
+    assert all(library.get(str(root / name)).error is None for name in ('a.pdf', 'c.pdf', 'd.pdf'))
+    # Recorded as broken, so it is not extracted (and crashed on) again
+    assert library_scan.scan(library, [str(root)], workers=2) == (4, 0, 0)
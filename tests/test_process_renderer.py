@@ -0,0 +1,61 @@
+import os
+import signal
+
+import fitz  # PyMuPDF
+import pytest
+from multiprocessing import shared_memory
+
+from viewer.process_renderer import RenderPool, attach_image
+from viewer.render_cache import RenderKey, render_page
+from viewer.render_worker import render_shared
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    document = fitz.open()
+    for number in range(3):
+        page = document.new_page(width=200, height=300)
+        page.insert_text((20, 40), f"Page {number}", fontsize=24)
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+def test_attach_image_matches_an_in_process_render(pdf):
+    key = RenderKey(1, 1.5, 1.0)
+    layout = render_shared(pdf, key)
+    image = attach_image(layout)
+    with fitz.open(pdf) as document:
+        expected = render_page(document, key)
+    assert image.size() == expected.size()
+    assert image.copy() == expected
+
+def test_attached_block_is_unlinked_but_stays_readable(pdf):
+    layout = render_shared(pdf, RenderKey(0, 1.0, 1.0))
+    image = attach_image(layout)
+    # The name is gone at once, so nothing leaks if the image is dropped...
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=layout[0])
+    # ...while the mapping the image wraps is still valid
+    copy = image.copy()
+    del image
+    assert not copy.isNull()
+    assert copy.pixelColor(0, 0).name() == '#ffffff'
+
+def test_pool_renders_like_the_worker_function(pool, pdf):
+    key = RenderKey(2, 1.0, 2.0, (0, 0))
+    assert pool.render(pdf, key) == attach_image(render_shared(pdf, key))
+
+def test_rendering_recovers_after_a_worker_dies(pool, pdf):
+    key = RenderKey(0, 1.0, 1.0)
+    expected = pool.render(pdf, key).copy()
+    for pid in list(pool._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+    # The dead worker broke the executor; the pool replaces it and retries
+    assert pool.render(pdf, key) == expected
+    assert pool.submit(pdf, RenderKey(1, 1.0, 1.0)).result() is not None
@@ -0,0 +1,46 @@
+from PySide6.QtGui import QImage
+
+from viewer.render_cache import PixmapCache, RenderKey, pixmap_bytes
+
+def image(width=10, height=10):
+    return QImage(width, height, QImage.Format_RGB888)
+
+def test_pixmap_bytes_from_size_and_depth():
+    assert pixmap_bytes(image(10, 20)) == 10 * 20 * 3
+
+def test_get_counts_hits_and_misses():
+    cache = PixmapCache(max_bytes=10_000)
+    key = RenderKey(0, 1.0, 1.0)
+    assert cache.get(key) is None
+    cache.put(key, image())
+    assert cache.get(key) is not None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_is_evicted_first():
+    size = pixmap_bytes(image())
+    cache = PixmapCache(max_bytes=size * 2)
+    cache.put('a', image())
+    cache.put('b', image())
+    cache.get('a')
+    cache.put('c', image())
+    assert cache.keys() == ['a', 'c']
+    assert cache.current_bytes == size * 2
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = PixmapCache(max_bytes=10_000)
+    cache.put('a', image(10, 10))
+    cache.put('a', image(20, 10))
+    assert len(cache) == 1
+    assert cache.current_bytes == pixmap_bytes(image(20, 10))
+
+def test_oversized_pixmap_is_not_cached():
+    cache = PixmapCache(max_bytes=100)
+    cache.put('a', image(100, 100))
+    assert 'a' not in cache
+    assert cache.current_bytes == 0
+
+def test_clear():
+    cache = PixmapCache(max_bytes=10_000)
+    cache.put('a', image())
+    cache.clear()
+    assert len(cache) == 0 and cache.current_bytes == 0
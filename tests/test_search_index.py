@@ -0,0 +1,69 @@
+from utils.search_index import SearchIndex, tokenize
+
+def make_index():
+    index = SearchIndex(page_count=3)
+    index.add_page(0, "The quick brown fox jumps over the lazy dog.")
+    index.add_page(1, "A brown dog, a quick fox; the quick brown fox again.")
+    index.add_page(2, "Nothing to see here.")
+    return index
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Hello, World! it's 2024") == ['hello', 'world', 'it', 's', '2024']
+
+def test_phrase_matches_words_in_order():
+    index = make_index()
+    assert index.search("quick brown fox") == [(0, 1), (1, 1)]
+    assert index.search("brown quick") == []
+    assert index.search("QUICK fox") == [(1, 1)]
+
+def test_single_word_counts_hits_per_page():
+    index = make_index()
+    assert index.search("fox") == [(0, 1), (1, 2)]
+    assert index.search("missing") == []
+    assert index.search("  ...  ") == []
+
+def test_unchanged_page_is_not_reindexed():
+    index = make_index()
+    assert not index.add_page(0, "The quick brown fox jumps over the lazy dog.")
+    assert index.add_page(0, "An entirely different page.")
+    assert index.search("lazy dog") == []
+    assert index.search("different page") == [(0, 1)]
+    # Words only the old text had are gone from the postings
+    assert 'lazy' not in index._postings
+
+def test_complete_once_every_page_is_indexed():
+    index = SearchIndex(page_count=2)
+    index.add_page(1, "second")
+    assert not index.complete
+    index.add_page(0, "first")
+    assert index.complete
+
+def test_truncate_forgets_pages_past_the_end():
+    index = make_index()
+    index.truncate(1)
+    assert index.page_count == 1
+    assert index.indexed_pages == 1
+    assert index.search("fox") == [(0, 1)]
+    assert index.search("nothing") == []
+
+def test_save_and_load_round_trip(tmp_path):
+    index = make_index()
+    index.source = (1234, 5678)
+    path = tmp_path / 'index.json.gz'
+    index.save(path)
+
+    loaded = SearchIndex.load(path)
+    assert loaded.page_count == 3
+    assert loaded.source == (1234, 5678)
+    assert loaded.search("quick brown fox") == index.search("quick brown fox")
+    # Pages come back as ints, so digests still match and updates replace pages
+    assert loaded.digest(1) == index.digest(1)
+    assert not loaded.add_page(2, "Nothing to see here.")
+    assert loaded.add_page(1, "replaced")
+    assert loaded.search("again") == []
+
+def test_load_rejects_missing_or_corrupt_files(tmp_path):
+    assert SearchIndex.load(tmp_path / 'missing.json.gz') is None
+    corrupt = tmp_path / 'corrupt.json.gz'
+    corrupt.write_bytes(b'not gzip')
+    assert SearchIndex.load(corrupt) is None